@@ -0,0 +1,66 @@
+"""
+Compares the loader's PIL -> QPixmap conversion before and after pil_to_qimage.
+
+    python -m digipage.benchmarks.bench_pil_to_qt [image ...]
+
+Without arguments a synthetic 4960x7016 (A4 @ 600 dpi) RGB and L page is used.
+Bytes copied counts every full-frame buffer produced on the way to the QPixmap.
+"""
+import sys
+import time
+from PIL import Image
+from PIL.ImageQt import ImageQt
+from PySide6.QtGui import QGuiApplication, QPixmap
+
+from digipage.workers.image_worker import pil_to_qimage
+
+REPEATS = 5
+
+def old_path(pil_img):
+    copied = 0
+    if pil_img.mode != "RGBA":
+        pil_img = pil_img.convert("RGBA")
+        copied += pil_img.width * pil_img.height * 4
+    q_image = ImageQt(pil_img)
+    copied += q_image.sizeInBytes()
+    pixmap = QPixmap.fromImage(q_image)
+    copied += pixmap.width() * pixmap.height() * pixmap.depth() // 8
+    return pixmap, copied
+
+def new_path(pil_img):
+    q_image = pil_to_qimage(pil_img)
+    copied = q_image.sizeInBytes()
+    pixmap = QPixmap.fromImage(q_image)
+    copied += pixmap.width() * pixmap.height() * pixmap.depth() // 8
+    return pixmap, copied
+
+def measure(fn, pil_img):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        _, copied = fn(pil_img)
+        best = min(best, time.perf_counter() - start)
+    return best, copied
+
+def sample_pages(paths):
+    if paths:
+        for path in paths:
+            with Image.open(path) as img:
+                img.load()
+                yield path, img.copy()
+        return
+    rgb = Image.radial_gradient("L").resize((4960, 7016)).convert("RGB")
+    yield "synthetic RGB 4960x7016", rgb
+    yield "synthetic L 4960x7016", rgb.convert("L")
+
+def main(argv):
+    app = QGuiApplication.instance() or QGuiApplication(argv[:1])
+    print(f"{'page':<32} {'path':<5} {'ms/page':>9} {'MB copied':>10}")
+    for name, pil_img in sample_pages(argv[1:]):
+        for label, fn in (("old", old_path), ("new", new_path)):
+            seconds, copied = measure(fn, pil_img)
+            print(f"{name[-32:]:<32} {label:<5} {seconds * 1000:>9.1f} {copied / 1024 / 1024:>10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
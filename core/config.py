@@ -8,6 +8,7 @@ CONFIG_FILE = "config.json"
 BOOKS_COMPLETE_LOG_FILE = "books_complete_log.json"
 ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff'}
 BACKUP_DIR = "scan_viewer_backups"
+PREVIEW_CACHE_DIR = "preview_cache"
 
 @dataclass
 class AppConfig:
@@ -23,9 +24,19 @@ class AppConfig:
     auto_lighting_correction_enabled: bool = False
     auto_color_correction_enabled: bool = False
     auto_sharpening_enabled: bool = False
+    auto_deskew_enabled: bool = False
+    auto_deskew_min_confidence: float = 0.3 # below this the angle only presets the rotate handle
+    auto_split_min_confidence: float = 0.5 # below this a detected split layout only presets the split handles
     theme: str = "Material Dark"
     image_load_timeout_ms: int = 4000
     caching_enabled: bool = True
+    cache_budget_mb: int = 1024 # decoded pixmaps
+    compressed_cache_budget_mb: int = 256 # raw file bytes kept to skip disk reads
+    prefetch_ahead: int = 3 # spreads warmed in the direction of navigation
+    prefetch_behind: int = 1
+    decode_workers: int = 4 # parallel image decodes (pages of a spread + prefetch)
+    preview_cache_enabled: bool = True # screen-sized previews kept on disk between sessions
+    preview_cache_budget_mb: int = 2048
     scanner_mode: str = "dual_scan"
 
 class ConfigManager:
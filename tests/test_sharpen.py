@@ -0,0 +1,76 @@
+"""
+Tests for the strip-wise unsharp mask and the auto-sharpen request.
+
+    python -m pytest digipage/tests
+"""
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+from PySide6.QtCore import QCoreApplication
+
+from digipage.workers import backup_store
+from digipage.workers.image_worker import ImageWorker, _CorrectTask
+from digipage.workers.sharpen import unsharp_mask
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+def text_page(mode="RGB", size=(300, 200)):
+    img = Image.new(mode, size, "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(20, size[1] - 20, 30):
+        draw.rectangle((20, y, size[0] - 20, y + 10), fill="black")
+    return img.filter(ImageFilter.GaussianBlur(1.5))
+
+def edge_contrast(img):
+    pixels = np.asarray(img.convert("L"), dtype=np.float32)
+    return float(np.abs(np.diff(pixels, axis=0)).max())
+
+@pytest.mark.parametrize("mode", ["RGB", "L"])
+def test_strips_match_a_single_pass(mode):
+    img = text_page(mode)
+    whole = unsharp_mask(img, strip_rows=img.height)
+    strips = unsharp_mask(img, strip_rows=7)
+    assert np.array_equal(np.asarray(whole), np.asarray(strips))
+
+def test_sharpens_edges_and_keeps_flat_paper():
+    img = text_page()
+    out = unsharp_mask(img)
+    assert out.size == img.size and out.mode == img.mode
+    assert edge_contrast(out) > edge_contrast(img)
+    flat = Image.new("RGB", (64, 64), (230, 225, 220))
+    assert np.array_equal(np.asarray(unsharp_mask(flat)), np.asarray(flat))
+
+def test_unsupported_mode_is_skipped():
+    assert unsharp_mask(Image.new("CMYK", (16, 16))) is None
+
+def test_auto_process_image_queues_sharpening(app):
+    worker = ImageWorker()
+    queued = []
+    worker._correct_pool.start = queued.append
+    worker.auto_process_image("page.png", False, False, True)
+    worker.auto_process_image("page.png", False, False, False)
+    assert len(queued) == 1
+    task = queued[0]
+    assert (task.path, task.lighting, task.color, task.sharpen) == ("page.png", False, False, True)
+
+def test_sharpen_task_rewrites_the_page(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_store, "_shared_store", backup_store.BackupStore(str(tmp_path / "backups")))
+    path = tmp_path / "page.png"
+    text_page().save(path)
+    before = Image.open(path).convert("RGB")
+
+    worker = ImageWorker()
+    completed, errors = [], []
+    worker.processing_complete.connect(completed.append)
+    worker.error_occurred.connect(errors.append)
+    _CorrectTask(worker, str(path), False, False, True, None).run()
+
+    assert errors == [] and completed == [str(path)]
+    with Image.open(path) as after:
+        assert edge_contrast(after) > edge_contrast(before)
+    backup_store.shared_backup_store().flush()
+    assert backup_store.shared_backup_store().restore(str(path))
+    with Image.open(path) as restored:
+        assert np.array_equal(np.asarray(restored.convert("RGB")), np.asarray(before))
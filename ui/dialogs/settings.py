@@ -1,18 +1,18 @@
 import sys
 import os
-import numpy as np
-from PIL import Image
 
 from PySide6.QtWidgets import (
     QApplication, QDialog, QTabWidget, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QLineEdit, QListWidget, QFileDialog, QMessageBox,
-    QCheckBox, QDialogButtonBox, QFormLayout, QListWidgetItem, QGroupBox, QRadioButton
+    QCheckBox, QDialogButtonBox, QFormLayout, QListWidgetItem, QGroupBox, QRadioButton, QSpinBox,
+    QProgressDialog
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QThread, Slot
 
 # --- Updated Imports ---
-from digipage.core.config import ConfigManager, AppConfig, ALLOWED_EXTENSIONS, CONFIG_FILE
+from digipage.core.config import ConfigManager, AppConfig, ALLOWED_EXTENSIONS
 from digipage.core.theme import THEMES, generate_stylesheet
+from digipage.workers.lighting_standard import LightingStandardWorker
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -26,6 +26,11 @@ class SettingsDialog(QDialog):
         # Work on a copy of the city paths to allow cancellation
         self.city_paths = self.app_config.city_paths.copy()
 
+        # Lighting standard computation, while running
+        self.standard_thread = None
+        self.standard_worker = None
+        self.standard_progress_dialog = None
+
         # Main layout
         self.layout = QVBoxLayout(self)
         self.tab_widget = QTabWidget()
@@ -74,6 +79,14 @@ class SettingsDialog(QDialog):
         self.caching_checkbox.setToolTip("Όταν είναι ενεργοποιημένη, οι εικόνες διατηρούνται στη μνήμη για ταχύτερη επαναφόρτωση. Απενεργοποιήστε για δοκιμές ή για εξοικονόμηση μνήμης RAM.")
         layout.addRow(self.caching_checkbox)
 
+        self.cache_budget_spin = QSpinBox()
+        self.cache_budget_spin.setRange(128, 32768)
+        self.cache_budget_spin.setSingleStep(128)
+        self.cache_budget_spin.setSuffix(" MB")
+        self.cache_budget_spin.setToolTip("Μέγιστη μνήμη RAM για αποκωδικοποιημένες εικόνες. Οι παλαιότερες εικόνες αφαιρούνται όταν ξεπεραστεί το όριο.")
+        self.caching_checkbox.toggled.connect(self.cache_budget_spin.setEnabled)
+        layout.addRow("Όριο Μνήμης Προσωρινής Αποθήκευσης:", self.cache_budget_spin)
+
         # --- Scanner Mode ---
         scanner_mode_group = QGroupBox("Τύπος Scanner / Λειτουργία")
         scanner_mode_layout = QVBoxLayout()
@@ -138,19 +151,21 @@ class SettingsDialog(QDialog):
         layout.addRow("Φάκελος Εικόνων Αναφοράς:", ref_folder_layout)
 
         # --- Calculate Standard Button ---
-        calc_btn = QPushButton("Υπολογισμός και Αποθήκευση Προτύπου")
-        calc_btn.setProperty("class", "filled")
-        calc_btn.clicked.connect(self.calculate_and_save_standard)
-        layout.addRow(calc_btn)
+        self.calc_btn = QPushButton("Υπολογισμός και Αποθήκευση Προτύπου")
+        self.calc_btn.setProperty("class", "filled")
+        self.calc_btn.clicked.connect(self.calculate_and_save_standard)
+        layout.addRow(self.calc_btn)
 
         # --- Auto Correction Toggles ---
         layout.addRow(QLabel("Αυτόματες Διορθώσεις σε Νέες Σαρώσεις:"))
         self.auto_lighting_checkbox = QCheckBox("Αυτόματη Προσαρμογή Φωτισμού & Αντίθεσης")
         self.auto_color_checkbox = QCheckBox("Αυτόματη Διόρθωση Απόχρωσης Χρώματος")
         self.auto_sharpen_checkbox = QCheckBox("Εφαρμογή ήπιας Ευκρίνειας")
+        self.auto_deskew_checkbox = QCheckBox("Αυτόματη Ευθυγράμμιση Κειμένου")
         layout.addRow(self.auto_lighting_checkbox)
         layout.addRow(self.auto_color_checkbox)
         layout.addRow(self.auto_sharpen_checkbox)
+        layout.addRow(self.auto_deskew_checkbox)
 
         self.tab_widget.addTab(tab, "Φωτισμός & Διόρθωση")
 
@@ -182,6 +197,8 @@ class SettingsDialog(QDialog):
         self.today_folder_edit.setText(self.app_config.todays_books_folder)
         self.ref_folder_edit.setText(self.app_config.lighting_standard_folder)
         self.caching_checkbox.setChecked(self.app_config.caching_enabled)
+        self.cache_budget_spin.setValue(self.app_config.cache_budget_mb)
+        self.cache_budget_spin.setEnabled(self.app_config.caching_enabled)
 
         if self.app_config.scanner_mode == "single_split":
             self.single_split_radio.setChecked(True)
@@ -191,6 +208,7 @@ class SettingsDialog(QDialog):
         self.auto_lighting_checkbox.setChecked(self.app_config.auto_lighting_correction_enabled)
         self.auto_color_checkbox.setChecked(self.app_config.auto_color_correction_enabled)
         self.auto_sharpen_checkbox.setChecked(self.app_config.auto_sharpening_enabled)
+        self.auto_deskew_checkbox.setChecked(self.app_config.auto_deskew_enabled)
 
         self.update_city_list()
 
@@ -253,30 +271,57 @@ class SettingsDialog(QDialog):
             QMessageBox.warning(self, "Δεν Βρέθηκαν Εικόνες", "Ο επιλεγμένος φάκελος δεν περιέχει υποστηριζόμενα αρχεία εικόνων.")
             return
 
-        try:
-            pil_images = [Image.open(p).convert('RGB') for p in image_files]
-            if not pil_images:
-                QMessageBox.warning(self, "Προειδοποίηση", "Δεν ήταν δυνατή η πρόσβαση σε έγκυρες εικόνες.")
-                return
-
-            target_size = pil_images[0].size
-            resized_images_np = []
-            for img in pil_images:
-                resized_img = img.resize(target_size, Image.Resampling.LANCZOS)
-                resized_images_np.append(np.array(resized_img))
-
-            
-            # More direct way to average
-            avg_image_array = np.mean(resized_images_np, axis=0).astype(np.uint8)
-            template_image = Image.fromarray(avg_image_array, 'RGB')
-
-            template_path = os.path.splitext(CONFIG_FILE)[0] + "_template.png"
-            template_image.save(template_path)
-
-            self.app_config.lighting_standard_metrics = {'histogram_template_path': template_path}
-            QMessageBox.information(self, "Επιτυχία", f"Υπολογίστηκε με επιτυχία το πρότυπο από {len(pil_images)} εικόνες.\nΠρότυπο αποθηκεύτηκε στη διαδρομή: {template_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Αποτυχία Υπολογισμού", f"Προέκυψε ένα σφάλμα: {e}")
+        # Decoding the references takes a while; run it off the GUI thread
+        self.calc_btn.setEnabled(False)
+        self.standard_thread = QThread()
+        self.standard_worker = LightingStandardWorker(image_files)
+        self.standard_worker.moveToThread(self.standard_thread)
+        self.standard_thread.started.connect(self.standard_worker.run)
+        self.standard_worker.progress.connect(self.on_standard_progress)
+        self.standard_worker.error_occurred.connect(self.on_standard_error)
+        self.standard_worker.finished.connect(self.on_standard_finished)
+
+        self.standard_progress_dialog = QProgressDialog("Υπολογισμός προτύπου φωτισμού...", "Ακύρωση", 0, len(image_files), self)
+        self.standard_progress_dialog.setWindowTitle("Πρότυπο Φωτισμού")
+        self.standard_progress_dialog.setWindowModality(Qt.WindowModal)
+        self.standard_progress_dialog.setAutoClose(False)
+        self.standard_progress_dialog.canceled.connect(self.standard_worker.cancel_operation, Qt.DirectConnection)
+        self.standard_progress_dialog.show()
+
+        self.standard_thread.start()
+
+    @Slot(int, int)
+    def on_standard_progress(self, processed, total):
+        if self.standard_progress_dialog is not None:
+            self.standard_progress_dialog.setValue(processed)
+
+    @Slot(str)
+    def on_standard_error(self, message):
+        QMessageBox.critical(self, "Αποτυχία Υπολογισμού", f"Προέκυψε ένα σφάλμα: {message}")
+
+    @Slot(object, int)
+    def on_standard_finished(self, metrics, used):
+        self._stop_standard_worker()
+        if metrics is not None:
+            # Only the template's histograms are kept; pages are matched against them on ingest
+            self.app_config.lighting_standard_metrics = metrics
+            QMessageBox.information(self, "Επιτυχία", f"Υπολογίστηκε με επιτυχία το πρότυπο από {used} εικόνες.")
+
+    def _stop_standard_worker(self):
+        if self.standard_thread is None:
+            return
+        self.standard_worker.cancel_operation()
+        self.standard_thread.quit()
+        self.standard_thread.wait()
+        self.standard_progress_dialog.close()
+        self.standard_worker.deleteLater()
+        self.standard_thread.deleteLater()
+        self.standard_thread = self.standard_worker = self.standard_progress_dialog = None
+        self.calc_btn.setEnabled(True)
+
+    def done(self, result):
+        self._stop_standard_worker()
+        super().done(result)
 
     def apply_theme(self, theme_name):
         self.app_config.theme = theme_name
@@ -295,9 +340,11 @@ class SettingsDialog(QDialog):
         self.app_config.lighting_standard_folder = self.ref_folder_edit.text()
         self.app_config.city_paths = self.city_paths
         self.app_config.caching_enabled = self.caching_checkbox.isChecked()
+        self.app_config.cache_budget_mb = self.cache_budget_spin.value()
         self.app_config.auto_lighting_correction_enabled = self.auto_lighting_checkbox.isChecked()
         self.app_config.auto_color_correction_enabled = self.auto_color_checkbox.isChecked()
         self.app_config.auto_sharpening_enabled = self.auto_sharpen_checkbox.isChecked()
+        self.app_config.auto_deskew_enabled = self.auto_deskew_checkbox.isChecked()
 
         if self.single_split_radio.isChecked():
             self.app_config.scanner_mode = "single_split"
@@ -10,11 +10,11 @@ from PySide6.QtWidgets import (
     QFrame, QMessageBox, QDialog, QToolButton, QSpacerItem, QSizePolicy, QApplication,
     QProgressDialog, QProgressBar, QStackedWidget
 )
-from PySide6.QtCore import Qt, QThread, Slot, QSize, QTimer
+from PySide6.QtCore import Qt, QThread, Signal, Slot, QSize, QTimer
 from PySide6.QtGui import QIcon, QPixmap, QColor
 
 # --- Updated Imports ---
-from digipage.core.config import ConfigManager, AppConfig
+from digipage.core.config import ConfigManager, AppConfig, PREVIEW_CACHE_DIR
 from digipage.core.theme import THEMES, generate_stylesheet, lighten_color
 from digipage.ui.widgets.image_viewer import ImageViewer, InteractionMode
 from digipage.workers.scanner_worker import ScanWorker # ScannerWorker
@@ -140,6 +140,9 @@ class StatsCardWidget(QWidget):
 
 
 class MainWindow(QMainWindow):
+    # Work handed to the scan worker's thread (queued, never run on the GUI thread)
+    deskew_requested = Signal(str)
+
     def __init__(self, app_config: AppConfig = None, parent=None):
         super().__init__(parent)
         self.setWindowTitle("DigiPage Scanner")
@@ -238,10 +241,20 @@ class MainWindow(QMainWindow):
             self.viewer2 = None
 
         self.ui_mode_stack.setCurrentIndex(0)
+        self.apply_prefetch_settings()
         main_v_layout.addWidget(content_area)
         self.create_bottom_bar(main_v_layout)
         self.create_sidebar()
 
+    def preview_cache_dir(self):
+        # Empty when previews should not be kept on disk
+        return PREVIEW_CACHE_DIR if self.app_config.preview_cache_enabled else ""
+
+    def apply_prefetch_settings(self):
+        # How many spreads the mode warms around the current one
+        if self.current_ui_mode and hasattr(self.current_ui_mode, 'configure_prefetch'):
+            self.current_ui_mode.configure_prefetch(self.app_config.prefetch_ahead, self.app_config.prefetch_behind)
+
     def create_sidebar(self):
         sidebar_dock = QDockWidget("Χειριστήρια & Στατιστικά", self)
         sidebar_dock.setAllowedAreas(Qt.RightDockWidgetArea)
@@ -408,8 +421,12 @@ class MainWindow(QMainWindow):
         self.scan_worker_thread.start()
         
         self.image_processor_thread = QThread()
-        self.image_processor = ImageProcessor()
+        self.image_processor = ImageProcessor(preview_store_dir=self.preview_cache_dir(),
+                                              preview_store_budget_mb=self.app_config.preview_cache_budget_mb)
         self.image_processor.set_caching_enabled(self.app_config.caching_enabled)
+        self.image_processor.set_cache_budget(self.app_config.cache_budget_mb, self.app_config.compressed_cache_budget_mb)
+        self.image_processor.set_decode_workers(self.app_config.decode_workers)
+        self.image_processor.set_lighting_standard(self.app_config.lighting_standard_metrics)
         self.image_processor.moveToThread(self.image_processor_thread)
         self.image_processor_thread.start()
         
@@ -428,6 +445,10 @@ class MainWindow(QMainWindow):
         self.scan_worker.file_operation_complete.connect(self.on_file_operation_complete)
         self.scan_worker.book_creation_progress.connect(self.on_book_creation_progress)
         self.scan_worker.transfer_preparation_complete.connect(self.on_transfer_preparation_complete)
+        self.scan_worker.layout_detected.connect(self.on_layout_detected)
+        self.scan_worker.skew_detected.connect(self.on_skew_detected)
+        self.scan_worker.deskew_finished.connect(self.on_deskew_finished)
+        self.deskew_requested.connect(self.scan_worker.auto_deskew)
         
         self.image_processor.processing_complete.connect(self.on_processing_complete)
         self.image_processor.error.connect(self.show_error)
@@ -443,11 +464,14 @@ class MainWindow(QMainWindow):
             self.viewer2['viewer'].crop_adjustment_started.connect(self.on_editing_started)
             self.viewer1['viewer'].zoom_state_changed.connect(self.on_viewer_zoom_changed)
             self.viewer2['viewer'].zoom_state_changed.connect(self.on_viewer_zoom_changed)
+            self._connect_progressive_loading(self.viewer1['viewer'], "left")
+            self._connect_progressive_loading(self.viewer2['viewer'], "right")
 
         elif isinstance(self.current_ui_mode, SingleSplitModeWidget):
             self.image_processor.image_loaded.connect(self.current_ui_mode.viewer.on_image_loaded)
             self.current_ui_mode.viewer.load_requested.connect(self.image_processor.request_image_load)
             self.current_ui_mode.viewer.crop_adjustment_started.connect(self.on_editing_started)
+            self._connect_progressive_loading(self.current_ui_mode.viewer, "single")
 
         if self.watcher:
             self.watcher.new_image_detected.connect(self.on_new_image_detected)
@@ -455,6 +479,18 @@ class MainWindow(QMainWindow):
             self.watcher.error.connect(self.show_error)
             self.watcher.finished.connect(self.watcher.thread.quit)
             
+    def _connect_progressive_loading(self, viewer, channel):
+        """
+        Shows a low-res preview while the full image decodes, if the loader supports
+        two-stage loads. Each viewer loads on its own channel, so paging on cancels
+        the decodes it no longer needs.
+        """
+        if not hasattr(self.image_processor, 'load_progressive'):
+            return
+        self.image_processor.preview_loaded.connect(viewer.on_preview_loaded)
+        viewer.progressive_load_requested.connect(self.image_processor.load_progressive)
+        viewer.set_progressive_loading(True, channel)
+
     @Slot(bool)
     def on_viewer_zoom_changed(self, is_zoomed):
         if not self.viewer1 or not self.viewer2:
@@ -547,18 +583,51 @@ class MainWindow(QMainWindow):
                     self.current_ui_mode.save_layout_data(path, layout)
                     QTimer.singleShot(100, lambda p=path, l=layout: self.perform_page_split(p, l))
                 else:
-                    pass
+                    # No saved layout: the worker detects the pages and reports them back
+                    QTimer.singleShot(100, lambda p=path: self.perform_page_split(p, {}))
             else:
-                auto_light = self.app_config.auto_lighting_correction_enabled
-                auto_color = self.app_config.auto_color_correction_enabled
-                if auto_light or auto_color:
-                    QTimer.singleShot(500, lambda p=path: self.image_processor.auto_process_image(p, auto_light, auto_color))
+                QTimer.singleShot(500, lambda p=path: self.process_new_scan(p))
 
             if not self.is_actively_editing:
                 self.update_timer.start()
             
             self._check_and_update_jump_button_animation()
 
+    def process_new_scan(self, path):
+        # Deskew first: it replaces the page the corrections are then applied to,
+        # so they are started from deskew_finished
+        if self.app_config.auto_deskew_enabled:
+            self.deskew_requested.emit(path)
+        else:
+            self.auto_correct_scan(path)
+
+    @Slot(str)
+    def on_deskew_finished(self, path):
+        self.auto_correct_scan(path)
+
+    def auto_correct_scan(self, path):
+        auto_light = self.app_config.auto_lighting_correction_enabled
+        auto_color = self.app_config.auto_color_correction_enabled
+        auto_sharpen = self.app_config.auto_sharpening_enabled
+        if auto_light or auto_color or auto_sharpen:
+            self.image_processor.auto_process_image(path, auto_light, auto_color, auto_sharpen)
+
+    @Slot(str, float, float)
+    def on_skew_detected(self, path, angle, confidence):
+        if self.viewer1 and self.viewer2:
+            self.viewer1['viewer'].suggest_rotation(path, angle)
+            self.viewer2['viewer'].suggest_rotation(path, angle)
+
+    @Slot(str, dict, float)
+    def on_layout_detected(self, path, layout, confidence):
+        if self.app_config.scanner_mode != "single_split":
+            return
+        if confidence >= self.app_config.auto_split_min_confidence:
+            self.current_ui_mode.save_layout_data(path, layout)
+        else:
+            # Only a guess: it presets the split handles for the operator to confirm
+            self.current_ui_mode.viewer.suggest_layout(path, layout)
+
     @Slot(str)
     def show_error(self, message):
         QMessageBox.critical(self, "Σφάλμα Εργασιών", message)
@@ -687,6 +756,11 @@ class MainWindow(QMainWindow):
                 self.viewer2['viewer'].set_theme_colors(primary_color, tertiary_color)
             
             self.image_processor.set_caching_enabled(self.app_config.caching_enabled)
+            self.image_processor.set_cache_budget(self.app_config.cache_budget_mb, self.app_config.compressed_cache_budget_mb)
+            self.image_processor.set_decode_workers(self.app_config.decode_workers)
+            self.image_processor.set_preview_store(self.preview_cache_dir(), self.app_config.preview_cache_budget_mb)
+            self.image_processor.set_lighting_standard(self.app_config.lighting_standard_metrics)
+            self.apply_prefetch_settings()
 
             if self.watcher and self.watcher.thread:
                 try:
@@ -712,7 +786,6 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             viewer_panel['viewer'].clear_image()
             viewer_panel['toolbar'].setEnabled(False)
-            self.image_processor.clear_cache_for_paths([image_path])
             self.scan_worker.delete_file(image_path)
 
     def delete_current_pair(self):
@@ -731,7 +804,6 @@ class MainWindow(QMainWindow):
                 )
                 if reply == QMessageBox.Yes:
                     self.current_ui_mode.viewer.clear_image()
-                    self.image_processor.clear_cache_for_paths([path_to_delete])
                     self.current_ui_mode.remove_layout_data(path_to_delete)
                     self.scan_worker.delete_split_image_and_artifacts(path_to_delete)
                     self.trigger_full_refresh(force_reload_viewers=True)
@@ -754,7 +826,6 @@ class MainWindow(QMainWindow):
             self.viewer1['toolbar'].setEnabled(False)
             self.viewer2['viewer'].clear_image()
             self.viewer2['toolbar'].setEnabled(False)
-            self.image_processor.clear_cache_for_paths(paths_to_delete)
             for path in paths_to_delete:
                 self.scan_worker.delete_file(path)
 
@@ -775,7 +846,6 @@ class MainWindow(QMainWindow):
             self.progress_dialog.show()
 
             files_to_move = list(self.image_files)
-            self.image_processor.clear_cache_for_paths(files_to_move)
             self.scan_worker.create_book(book_name, files_to_move)
 
     @Slot(int, int)
@@ -791,7 +861,6 @@ class MainWindow(QMainWindow):
                                      f"Επαναφορά της αρχικής εικόνας; Αυτό θα αντικαταστήσει τυχόν αλλαγές.\n\n{os.path.basename(image_path)}",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.image_processor.clear_cache_for_paths([image_path])
             self.scan_worker.restore_image(image_path)
 
     def transfer_all_books(self):
@@ -838,7 +907,6 @@ class MainWindow(QMainWindow):
             elif operation_type == "split":
                 self.viewer1['viewer'].set_splitting_mode(False)
                 self.viewer2['viewer'].set_splitting_mode(False)
-                self.image_processor.clear_cache()
                 self.status_label.setText("Ανανέωση λίστας αρχείων...")
                 self.trigger_full_refresh(force_reload_viewers=True)
 
@@ -854,7 +922,6 @@ class MainWindow(QMainWindow):
                 self.statusBar().showMessage(f"✓ Αποθηκεύτηκαν οι σελίδες για: {filename}", 4000)
 
             elif operation_type == "delete":
-                self.image_processor.clear_cache()
                 self.status_label.setText("Ανανέωση λίστας αρχείων...")
                 self.trigger_full_refresh(force_reload_viewers=True)
 
@@ -876,13 +943,11 @@ class MainWindow(QMainWindow):
         if viewer.image_path and viewer.interaction_mode == InteractionMode.CROPPING:
             crop_rect = viewer.get_image_space_crop_rect()
             if crop_rect:
-                self.image_processor.clear_cache_for_paths([viewer.image_path])
                 self.scan_worker.crop_and_save_image(viewer.image_path, crop_rect)
     
     def apply_color_fix(self, viewer_panel):
         viewer = viewer_panel['viewer']
         if viewer.image_path:
-            self.image_processor.clear_cache_for_paths([viewer.image_path])
             self.scan_worker.correct_color_and_save(viewer.image_path)
 
     def toggle_split_mode(self, viewer_panel, enable):
@@ -918,7 +983,6 @@ class MainWindow(QMainWindow):
 
             split_x = viewer.get_split_x_in_image_space()
             if split_x is not None:
-                self.image_processor.clear_cache_for_paths([path_to_split])
                 self.scan_worker.split_image(path_to_split, split_x)
         
         self.toggle_split_mode(viewer_panel, False)
@@ -975,7 +1039,6 @@ class MainWindow(QMainWindow):
         new_path1 = self.replace_candidates[0]
         new_path2 = self.replace_candidates[1]
 
-        self.image_processor.clear_cache_for_paths([old_path1, old_path2])
         self.scan_worker.replace_pair(old_path1, old_path2, new_path1, new_path2)
         self.toggle_replace_mode()
 
@@ -15,6 +15,8 @@ class BaseScanMode(QWidget):
         super().__init__(parent)
         self.image_files = []
         self.current_index = 0
+        self.nav_direction = 1 # +1 forward, -1 backward; steers prefetching
+        self.prefetcher = None # PrefetchScheduler, set up by subclasses
 
     @Slot(list)
     def set_file_list(self, files):
@@ -32,6 +34,11 @@ class BaseScanMode(QWidget):
             # Auto-navigate to end logic usually happens here
             self.go_to_end()
 
+    def configure_prefetch(self, ahead: int, behind: int):
+        """Sets how many spreads to warm ahead of and behind the current one."""
+        if self.prefetcher:
+            self.prefetcher.configure(ahead, behind)
+
     def go_next(self):
         """Move selection forward."""
         pass
@@ -1,6 +1,7 @@
 from PySide6.QtWidgets import QHBoxLayout, QFrame
 from PySide6.QtCore import Qt
 from digipage.ui.modes.base import BaseScanMode
+from digipage.ui.modes.prefetch import PrefetchScheduler
 from digipage.ui.viewer.canvas import ImageCanvas
 from digipage.workers.image_worker import ImageWorker
 
@@ -11,6 +12,7 @@ class DualScanMode(BaseScanMode):
     def __init__(self, image_worker: ImageWorker, parent=None):
         super().__init__(parent)
         self.image_worker = image_worker
+        self.prefetcher = PrefetchScheduler(image_worker, step=2)
         
         layout = QHBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -21,8 +23,8 @@ class DualScanMode(BaseScanMode):
         self.canvas_r = ImageCanvas()
         
         # Connect signals for rotation/cropping
-        self._connect_canvas(self.canvas_l)
-        self._connect_canvas(self.canvas_r)
+        self._connect_canvas(self.canvas_l, "left")
+        self._connect_canvas(self.canvas_r, "right")
 
         layout.addWidget(self.create_frame(self.canvas_l))
         layout.addWidget(self.create_frame(self.canvas_r))
@@ -35,11 +37,16 @@ class DualScanMode(BaseScanMode):
         l.addWidget(canvas)
         return f
 
-    def _connect_canvas(self, canvas: ImageCanvas):
+    def _connect_canvas(self, canvas: ImageCanvas, channel: str):
         # Connect image loading from worker to canvas
         self.image_worker.image_loaded.connect(
             lambda path, pix: canvas.set_image(path, pix) if canvas.image_path == path else None
         )
+        self.image_worker.preview_loaded.connect(
+            lambda path, pix, size: canvas.set_preview(path, pix, size) if canvas.image_path == path else None
+        )
+        # Pages are loaded at canvas resolution; full resolution only once zoomed past fit
+        canvas.full_resolution_requested.connect(lambda path: self.image_worker.load_image(path, False, None, channel))
         # Connect interaction results back to main window (via base class signal)
         canvas.crop_applied.connect(lambda p, r: self.request_worker_action.emit("crop", (p, r)))
         canvas.rotation_applied.connect(lambda p, a: self.request_worker_action.emit("rotate", (p, a)))
@@ -51,10 +58,13 @@ class DualScanMode(BaseScanMode):
 
         # Request loads
         self.canvas_l.image_path = p1 # Set immediately so callback checks match
-        self.image_worker.load_image(p1)
+        self.image_worker.load_image(p1, False, self.canvas_l.decode_size(), "left")
         
         self.canvas_r.image_path = p2
-        self.image_worker.load_image(p2)
+        self.image_worker.load_image(p2, False, self.canvas_r.decode_size(), "right")
+
+        # Warm the cache with the spreads the operator is heading towards
+        self.prefetcher.schedule(self.image_files, self.current_index, self.nav_direction, self.canvas_l.decode_size())
 
         # Update navigation state
         has_prev = self.current_index > 0
@@ -74,11 +84,13 @@ class DualScanMode(BaseScanMode):
     def go_next(self):
         if self.current_index + 2 < len(self.image_files):
             self.current_index += 2
+            self.nav_direction = 1
             self.refresh_view()
 
     def go_prev(self):
         if self.current_index > 0:
             self.current_index -= 2
+            self.nav_direction = -1
             self.refresh_view()
             
     def go_to_end(self):
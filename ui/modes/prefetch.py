@@ -0,0 +1,36 @@
+from PySide6.QtCore import QSize
+
+class PrefetchScheduler:
+    """
+    Decides which pages to warm in the ImageWorker cache after each navigation:
+    `ahead` spreads in the direction of travel, then `behind` spreads the other way.
+    A spread is `step` consecutive files (2 in dual scan mode, 1 in single split mode).
+    """
+    def __init__(self, image_worker, step: int, ahead: int = 3, behind: int = 1):
+        self.image_worker = image_worker
+        self.step = step
+        self.ahead = ahead
+        self.behind = behind
+
+    def configure(self, ahead: int, behind: int):
+        self.ahead = max(0, ahead)
+        self.behind = max(0, behind)
+
+    def window(self, files: list, index: int, direction: int) -> list:
+        """Paths to keep warm, nearest first. The visible spread leads so it is never evicted for a prefetch."""
+        direction = 1 if direction >= 0 else -1
+        starts = [index]
+        starts += [index + direction * k * self.step for k in range(1, self.ahead + 1)]
+        starts += [index - direction * k * self.step for k in range(1, self.behind + 1)]
+
+        paths = []
+        for start in starts:
+            for i in range(start, start + self.step):
+                if 0 <= i < len(files):
+                    paths.append(files[i])
+        return paths
+
+    def schedule(self, files: list, index: int, direction: int, target_size: QSize):
+        if not files or (self.ahead == 0 and self.behind == 0):
+            return
+        self.image_worker.prefetch(self.window(files, index, direction), target_size)
@@ -1,6 +1,7 @@
 from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QPushButton
 from PySide6.QtCore import Qt
 from digipage.ui.modes.base import BaseScanMode
+from digipage.ui.modes.prefetch import PrefetchScheduler
 from digipage.ui.viewer.canvas import ImageCanvas
 from digipage.workers.image_worker import ImageWorker
 
@@ -12,6 +13,7 @@ class SingleSplitMode(BaseScanMode):
     def __init__(self, image_worker: ImageWorker, parent=None):
         super().__init__(parent)
         self.image_worker = image_worker
+        self.prefetcher = PrefetchScheduler(image_worker, step=1)
         
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -25,6 +27,10 @@ class SingleSplitMode(BaseScanMode):
         self.image_worker.image_loaded.connect(
             lambda path, pix: self.canvas.set_image(path, pix) if self.canvas.image_path == path else None
         )
+        self.image_worker.preview_loaded.connect(
+            lambda path, pix, size: self.canvas.set_preview(path, pix, size) if self.canvas.image_path == path else None
+        )
+        self.canvas.full_resolution_requested.connect(lambda path: self.image_worker.load_image(path, False, None, "single"))
         
         layout.addWidget(self.canvas)
 
@@ -44,7 +50,8 @@ class SingleSplitMode(BaseScanMode):
             
         path = self.image_files[self.current_index]
         self.canvas.image_path = path
-        self.image_worker.load_image(path)
+        self.image_worker.load_image(path, False, self.canvas.decode_size(), "single")
+        self.prefetcher.schedule(self.image_files, self.current_index, self.nav_direction, self.canvas.decode_size())
         
         has_prev = self.current_index > 0
         has_next = self.current_index < total - 1
@@ -54,11 +61,13 @@ class SingleSplitMode(BaseScanMode):
     def go_next(self):
         if self.current_index < len(self.image_files) - 1:
             self.current_index += 1
+            self.nav_direction = 1
             self.refresh_view()
 
     def go_prev(self):
         if self.current_index > 0:
             self.current_index -= 1
+            self.nav_direction = -1
             self.refresh_view()
 
     def go_to_end(self):
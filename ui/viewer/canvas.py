@@ -1,8 +1,10 @@
 from PySide6.QtWidgets import QWidget
-from PySide6.QtGui import QPainter, QPixmap, QColor, QPen, QPainterPath, QBrush
-from PySide6.QtCore import Qt, Signal, Slot, QRectF, QPointF, QPropertyAnimation, QEasingCurve, QPoint
+from PySide6.QtGui import QPainter, QPixmap, QColor, QPen, QPainterPath, QBrush, QRegion
+from PySide6.QtCore import Qt, Signal, Slot, QRect, QRectF, QPointF, QPropertyAnimation, QEasingCurve, QPoint, QSize, QTimer
 
 from digipage.ui.viewer.handlers import InteractionHandler, PanHandler, CropHandler, RotateHandler
+from digipage.ui.viewer.tiles import TilePyramid
+from digipage.utils.geometry import rotation_zoom
 import math
 
 class ImageCanvas(QWidget):
@@ -16,6 +18,7 @@ class ImageCanvas(QWidget):
     zoom_changed = Signal(bool)
     crop_applied = Signal(str, object) # path, rect
     rotation_applied = Signal(str, float) # path, angle
+    full_resolution_requested = Signal(str) # path, emitted when zooming past fit on a preview
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -25,7 +28,22 @@ class ImageCanvas(QWidget):
         # Data
         self.image_path = None
         self.pixmap = QPixmap()
+        # Fit-to-view rendering of the image, reused until zoom, size or pixmap change
         self.display_pixmap = QPixmap()
+        self._display_key = None
+        # Geometry is always expressed in full-resolution image space, even
+        # when self.pixmap is a reduced preview of the file.
+        self.image_size = QSize()
+        self._preview_path = None
+        self._full_res_requested = False
+        # Multi-resolution tiles of the full-resolution pixmap (None while a preview is shown)
+        self._tiles = None
+        # Tiles that arrived since the last repaint, in image coordinates; a burst
+        # of them is repainted once, on the next pass of the event loop
+        self._arrived_tiles = []
+        self.tile_repaint_timer = QTimer(self)
+        self.tile_repaint_timer.setSingleShot(True)
+        self.tile_repaint_timer.timeout.connect(self._repaint_arrived_tiles)
         
         # Appearance
         self.accent_color = QColor("#b0c6ff")
@@ -58,14 +76,48 @@ class ImageCanvas(QWidget):
     def get_zoom_level(self): return self._zoom_level
     def set_zoom_level(self, val):
         self._zoom_level = val
-        self.zoom_changed.emit(val > self.get_fit_zoom())
+        zoomed_in = val > self.get_fit_zoom()
+        self.zoom_changed.emit(zoomed_in)
+        if zoomed_in and self._preview_path and not self._full_res_requested:
+            self._full_res_requested = True
+            self.full_resolution_requested.emit(self._preview_path)
         self.update()
     zoom_level = property(get_zoom_level, set_zoom_level)
 
     # --- Public API ---
     def set_image(self, path: str, pixmap: QPixmap):
+        pixmap = pixmap if pixmap is not None else QPixmap()
+        if path is not None and path == self._preview_path and not pixmap.isNull():
+            # Full-resolution upgrade of the preview on screen: keep zoom, pan and handler state
+            self.pixmap = pixmap
+            self._preview_path = None
+            self._set_tiles(pixmap)
+            self.update()
+            return
+        self._show_image(path, pixmap, pixmap.size())
+        self._set_tiles(pixmap)
+
+    def set_preview(self, path: str, pixmap: QPixmap, full_size: QSize):
+        """Shows a reduced decode of the image; full_size is the size of the file on disk."""
+        self._show_image(path, pixmap, full_size)
+        self._preview_path = path if not pixmap.isNull() else None
+
+    def decode_size(self) -> QSize:
+        """The pixel size a loader needs to fill this canvas at fit zoom."""
+        dpr = self.devicePixelRatioF()
+        return QSize(math.ceil(self.width() * dpr), math.ceil(self.height() * dpr))
+
+    def image_rect(self) -> QRect:
+        """The full-resolution image bounds, in image coordinates."""
+        return QRect(QPoint(0, 0), self.image_size)
+
+    def _show_image(self, path, pixmap, full_size):
         self.image_path = path
         self.pixmap = pixmap
+        self.image_size = QSize(full_size)
+        self._preview_path = None
+        self._full_res_requested = False
+        self._set_tiles(None)
         self.rotation_angle = 0.0
         self.pan_offset = QPointF(0, 0)
         
@@ -75,6 +127,17 @@ class ImageCanvas(QWidget):
         
         self.update()
 
+    def _set_tiles(self, pixmap):
+        if self._tiles is not None:
+            # No deleteLater(): queued tile tasks still hold (and emit on) the old pyramid
+            self._tiles.close()
+            self._tiles = None
+        self._arrived_tiles.clear()
+        self.tile_repaint_timer.stop()
+        if pixmap is not None and not pixmap.isNull():
+            self._tiles = TilePyramid(pixmap)
+            self._tiles.tile_ready.connect(self._on_tile_ready)
+
     def set_mode(self, mode: str):
         if mode in self.handlers:
             self.current_handler = self.handlers[mode]
@@ -94,15 +157,15 @@ class ImageCanvas(QWidget):
         self.zoom_animation.start()
 
     def get_fit_zoom(self):
-        if self.pixmap.isNull() or self.width() == 0 or self.height() == 0: return 1.0
-        return min(self.width() / self.pixmap.width(), self.height() / self.pixmap.height())
+        if self.pixmap.isNull() or self.image_size.isEmpty() or self.width() == 0 or self.height() == 0: return 1.0
+        return min(self.width() / self.image_size.width(), self.height() / self.image_size.height())
 
     # --- Coordinate Mapping ---
     def map_image_to_widget(self, image_point: QPointF) -> QPointF:
         """Converts a point from Image Space to Widget Space."""
         # Calculate offset to center image
-        scaled_w = self.pixmap.width() * self._zoom_level
-        scaled_h = self.pixmap.height() * self._zoom_level
+        scaled_w = self.image_size.width() * self._zoom_level
+        scaled_h = self.image_size.height() * self._zoom_level
         x_offset = (self.width() - scaled_w) / 2 + self.pan_offset.x()
         y_offset = (self.height() - scaled_h) / 2 + self.pan_offset.y()
         
@@ -113,8 +176,8 @@ class ImageCanvas(QWidget):
 
     def map_widget_to_image(self, widget_point: QPoint) -> QPointF:
         """Converts a point from Widget Space to Image Space."""
-        scaled_w = self.pixmap.width() * self._zoom_level
-        scaled_h = self.pixmap.height() * self._zoom_level
+        scaled_w = self.image_size.width() * self._zoom_level
+        scaled_h = self.image_size.height() * self._zoom_level
         x_offset = (self.width() - scaled_w) / 2 + self.pan_offset.x()
         y_offset = (self.height() - scaled_h) / 2 + self.pan_offset.y()
         
@@ -131,8 +194,8 @@ class ImageCanvas(QWidget):
         """Prevents panning the image too far out of view."""
         if self.pixmap.isNull(): return
         
-        scaled_w = self.pixmap.width() * self._zoom_level
-        scaled_h = self.pixmap.height() * self._zoom_level
+        scaled_w = self.image_size.width() * self._zoom_level
+        scaled_h = self.image_size.height() * self._zoom_level
         
         # Allow panning if image is larger than widget
         max_x = max(0, (scaled_w - self.width()) / 2)
@@ -155,22 +218,112 @@ class ImageCanvas(QWidget):
 
         # Draw Image
         # We calculate the target rect in widget coordinates
-        target_rect = self.map_rect_to_widget(QRectF(self.pixmap.rect()))
+        # (the pixmap may be a reduced preview, so map the full image bounds)
+        target_rect = self.map_rect_to_widget(QRectF(self.image_rect()))
         
         if self.rotation_angle != 0:
-            # Complex rotation drawing handled by painter transform
-            cx, cy = target_rect.center().x(), target_rect.center().y()
-            painter.translate(cx, cy)
-            painter.rotate(self.rotation_angle)
-            painter.translate(-cx, -cy)
-            painter.drawPixmap(target_rect.toRect(), self.pixmap)
-            painter.resetTransform()
+            self._paint_rotated(painter, target_rect)
+        elif self._cached_display(target_rect):
+            painter.drawPixmap(target_rect.toAlignedRect().topLeft(), self.display_pixmap)
+        elif self._tiles is not None:
+            self._paint_tiles(painter)
         else:
             painter.drawPixmap(target_rect.toRect(), self.pixmap)
 
         # Delegate UI drawing to handler
         self.current_handler.paint(painter)
 
+    def _paint_rotated(self, painter, target_rect: QRectF):
+        """
+        Rotation preview with the same geometry as ScannerWorker.rotate_and_crop:
+        rotated about the center, zoomed by rotation_zoom() and clipped to the
+        original frame. Drawn from the screen-sized display_pixmap rather than
+        the full-resolution pixmap, with a fast transform while the handle is dragged.
+        """
+        source, source_rect = self.pixmap, QRectF(self.pixmap.rect())
+        if self._cached_display(target_rect):
+            # The cached rendering covers the pixel-aligned target rect, in device pixels
+            source, dpr = self.display_pixmap, self.display_pixmap.devicePixelRatio()
+            offset = target_rect.topLeft() - QPointF(target_rect.toAlignedRect().topLeft())
+            source_rect = QRectF(offset * dpr, target_rect.size() * dpr)
+
+        zoom = rotation_zoom(self.image_size.width(), self.image_size.height(), self.rotation_angle)
+        center = target_rect.center()
+        painter.save()
+        painter.setClipRect(target_rect)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, not self.current_handler.is_active)
+        painter.translate(center)
+        painter.scale(zoom, zoom)
+        painter.rotate(self.rotation_angle)
+        painter.translate(-center)
+        painter.drawPixmap(target_rect, source, source_rect)
+        painter.restore()
+
+    def _cached_display(self, target_rect: QRectF) -> bool:
+        """
+        Makes sure display_pixmap holds the image rendered at target_rect, so
+        repaints (e.g. while a crop handle is dragged) are a blit of the damaged
+        region instead of a resample. Only done while the whole image fits in
+        the canvas; returns False when the caller has to draw the image itself.
+        """
+        if target_rect.width() > self.width() + 1 or target_rect.height() > self.height() + 1:
+            return False
+        dpr = self.devicePixelRatioF()
+        key = (target_rect.getRect(), dpr, self.pixmap.cacheKey())
+        if key == self._display_key:
+            return True
+
+        # Aligned to whole widget pixels so that drawing it back is a plain blit
+        aligned = target_rect.toAlignedRect()
+        rendering = QPixmap(max(1, math.ceil(aligned.width() * dpr)), max(1, math.ceil(aligned.height() * dpr)))
+        rendering.setDevicePixelRatio(dpr)
+        rendering.fill(Qt.transparent)
+        painter = QPainter(rendering)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.translate(-QPointF(aligned.topLeft()))
+        if self._tiles is not None:
+            complete = self._paint_tiles(painter)
+        else:
+            painter.drawPixmap(target_rect, self.pixmap, QRectF(self.pixmap.rect()))
+            complete = True
+        painter.end()
+
+        self.display_pixmap = rendering
+        # Keep drawing from the pyramid until all of its tiles have been scaled
+        self._display_key = key if complete else None
+        return True
+
+    def _paint_tiles(self, painter) -> bool:
+        """
+        Draws only the part of the image inside the viewport, from the nearest
+        pyramid level. Returns False if some tiles were not scaled yet.
+        """
+        bounds = QRectF(self.image_rect())
+        visible = QRectF(
+            self.map_widget_to_image(QPoint(0, 0)), self.map_widget_to_image(QPoint(self.width(), self.height()))
+        ).intersected(bounds)
+        if visible.isEmpty():
+            return True
+
+        level = TilePyramid.level_for_zoom(self._zoom_level * self.devicePixelRatioF())
+        if level == 0:
+            painter.drawPixmap(self.map_rect_to_widget(visible), self.pixmap, visible)
+            return True
+
+        complete = True
+        step = self._tiles.tile_step(level)
+        for ty in range(int(visible.top() // step), math.ceil(visible.bottom() / step)):
+            for tx in range(int(visible.left() // step), math.ceil(visible.right() / step)):
+                src = QRectF(tx * step, ty * step, step, step).intersected(bounds)
+                tile = self._tiles.tile(level, tx, ty)
+                if tile is not None:
+                    painter.drawPixmap(self.map_rect_to_widget(src), tile, QRectF(tile.rect()))
+                else:
+                    # Not scaled yet: sample this region of the full image meanwhile
+                    painter.drawPixmap(self.map_rect_to_widget(src), self.pixmap, src)
+                    complete = False
+        return complete
+
     def mousePressEvent(self, event):
         img_pos = self.map_widget_to_image(event.pos())
         self.current_handler.on_mouse_press(event, img_pos)
@@ -216,6 +369,27 @@ class ImageCanvas(QWidget):
         super().resizeEvent(event)
 
     # --- Internal Slots ---
+    @Slot(QRect)
+    def _on_tile_ready(self, image_rect):
+        self._arrived_tiles.append(image_rect)
+        if not self.tile_repaint_timer.isActive():
+            self.tile_repaint_timer.start(0)
+
+    @Slot()
+    def _repaint_arrived_tiles(self):
+        """Repaints only where the arrived tiles land, mapped with the zoom and pan at repaint time."""
+        rects, self._arrived_tiles = self._arrived_tiles, []
+        if self.rotation_angle != 0:
+            # The rotated preview moves every tile; there is no cheaper damage than all of it
+            self.update()
+            return
+        region = QRegion()
+        for rect in rects:
+            # One pixel of margin for the smooth-transform bleed at the tile edges
+            widget_rect = self.map_rect_to_widget(QRectF(rect)).toAlignedRect().adjusted(-1, -1, 1, 1)
+            region = region.united(widget_rect)
+        self.update(region.intersected(self.rect()))
+
     @Slot(object)
     def _on_crop_finished(self, rect):
         if self.image_path:
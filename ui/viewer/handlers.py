@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 import math
 from PySide6.QtCore import Qt, QRect, QRectF, QPointF, Signal, QObject
-from PySide6.QtGui import QPainter, QColor, QPen, QBrush, QPainterPath
+from PySide6.QtGui import QPainter, QColor, QPen, QBrush, QPainterPath, QRegion
 
 class InteractionHandler(QObject):
     """Abstract base class for handling mouse interactions on the canvas."""
@@ -74,7 +74,7 @@ class CropHandler(InteractionHandler):
         super().reset()
         if not self.canvas.pixmap.isNull():
             # Default to full image
-            self.crop_rect = self.canvas.pixmap.rect()
+            self.crop_rect = self.canvas.image_rect()
 
     def _get_widget_rect(self):
         return self.canvas.map_rect_to_widget(self.crop_rect)
@@ -134,6 +134,7 @@ class CropHandler(InteractionHandler):
             return
 
         # Drag logic (in Image Coordinates)
+        old_widget_rect = widget_rect
         rect = self.crop_rect
         
         if self.active_handle == "move":
@@ -149,9 +150,24 @@ class CropHandler(InteractionHandler):
         
         # Normalize and clamp
         rect = rect.normalized()
-        rect = rect.intersected(self.canvas.pixmap.rect())
+        rect = rect.intersected(self.canvas.image_rect())
         self.crop_rect = rect
-        self.canvas.update()
+        self.canvas.update(self._damage(old_widget_rect, self._get_widget_rect()))
+
+    def _damage(self, old: QRectF, new: QRectF) -> QRegion:
+        """
+        The part of the canvas that changes when the crop rectangle moves from
+        old to new: the band whose dimming flips, plus the border and handles
+        around both rectangles.
+        """
+        m = self.HANDLE_SIZE // 2
+        region = QRegion(old.toAlignedRect()).xored(QRegion(new.toAlignedRect()))
+        for r in (old, new):
+            ring = QRegion(r.adjusted(-m, -m, m, m).toAlignedRect())
+            if r.width() > 2 * m and r.height() > 2 * m:
+                ring = ring.subtracted(QRegion(r.adjusted(m, m, -m, -m).toAlignedRect()))
+            region += ring
+        return region
 
     def on_mouse_release(self, event, image_pos):
         self.is_active = False
@@ -217,6 +233,7 @@ class RotateHandler(InteractionHandler):
         if self.is_active:
             self.is_active = False
             self.cursor_changed.emit(Qt.OpenHandCursor)
+            self.canvas.update() # Redraw the preview filtered
             self.angle_changed.emit(self.angle)
 
     def _get_handle_rect(self):
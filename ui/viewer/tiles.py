@@ -0,0 +1,97 @@
+import math
+from collections import OrderedDict
+from PySide6.QtCore import QObject, Signal, Slot, Qt, QRect, QRunnable, QThreadPool
+from PySide6.QtGui import QImage, QPixmap
+
+TILE_SIZE = 512
+
+class _TileTask(QRunnable):
+    """Scales one tile out of the full-resolution image on a pool thread."""
+    def __init__(self, pyramid, level, tx, ty):
+        super().__init__()
+        self.pyramid = pyramid
+        self.source = pyramid.source # implicitly shared; stays valid after close()
+        self.key = (level, tx, ty)
+
+    def run(self):
+        if self.pyramid.closed:
+            return
+        level, tx, ty = self.key
+        step = TILE_SIZE << level
+        src = QRect(tx * step, ty * step, step, step).intersected(self.source.rect())
+        size = src.size() / (1 << level)
+        tile = self.source.copy(src).scaled(
+            max(1, size.width()), max(1, size.height()), Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+        )
+        self.pyramid._tile_scaled.emit(self.key, tile)
+
+class TilePyramid(QObject):
+    """
+    Lazily built multi-resolution tiles of one full-resolution image.
+
+    Level 0 is the image itself; level k holds TILE_SIZE x TILE_SIZE tiles scaled
+    down by 2**k. Tiles are scaled on the global thread pool the first time the
+    canvas asks for them and kept in a byte-bounded LRU, so zooming out on a huge
+    scan only ever resamples what is on screen, once.
+    """
+    tile_ready = Signal(QRect) # bounds of the new tile, in full-resolution image coordinates
+
+    # Internal: pool thread -> GUI thread hand-off
+    _tile_scaled = Signal(object, QImage)
+
+    def __init__(self, pixmap: QPixmap, budget_bytes: int = 96 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.source = pixmap.toImage()
+        self.closed = False
+        self._budget = budget_bytes
+        self._tiles = OrderedDict()  # (level, tx, ty) -> QPixmap
+        self._bytes = 0
+        self._pending = set()
+        self._tile_scaled.connect(self._on_tile_scaled)
+
+    @staticmethod
+    def level_for_zoom(zoom: float) -> int:
+        """The coarsest level that still has at least one source pixel per device pixel."""
+        if zoom <= 0 or zoom >= 1.0:
+            return 0
+        return int(math.floor(math.log2(1.0 / zoom)))
+
+    def tile_step(self, level: int) -> int:
+        """Size of a level's tile in full-resolution pixels."""
+        return TILE_SIZE << level
+
+    def tile(self, level: int, tx: int, ty: int):
+        """Returns the tile pixmap, or None after queueing it for scaling."""
+        key = (level, tx, ty)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+        if key not in self._pending and not self.closed:
+            self._pending.add(key)
+            QThreadPool.globalInstance().start(_TileTask(self, level, tx, ty))
+        return None
+
+    def close(self):
+        """Releases all tiles; queued tasks for this pyramid become no-ops."""
+        self.closed = True
+        self._tiles.clear()
+        self._pending.clear()
+        self._bytes = 0
+        self.source = QImage()
+
+    @Slot(object, QImage)
+    def _on_tile_scaled(self, key, image):
+        if self.closed:
+            return
+        self._pending.discard(key)
+        pixmap = QPixmap.fromImage(image)
+        nbytes = pixmap.width() * pixmap.height() * 4
+        self._tiles[key] = pixmap
+        self._bytes += nbytes
+        while self._bytes > self._budget and len(self._tiles) > 1:
+            _, old = self._tiles.popitem(last=False)
+            self._bytes -= old.width() * old.height() * 4
+        level, tx, ty = key
+        step = self.tile_step(level)
+        self.tile_ready.emit(QRect(tx * step, ty * step, step, step).intersected(self.source.rect()))
@@ -5,6 +5,14 @@ from PySide6.QtWidgets import QWidget, QApplication, QPushButton, QVBoxLayout, Q
 from PySide6.QtGui import QPixmap, QPainter, QColor, QPen, QBrush, QPainterPath, QLinearGradient
 from PySide6.QtCore import Qt, QRect, QPoint, QSize, Signal, Slot, QPropertyAnimation, QEasingCurve, QRectF, QPointF, QTimer, Property, QEvent
 
+from digipage.utils.geometry import rotation_zoom
+
+# Quiet period after the last wheel step or resize before the smooth rescale
+ZOOM_SETTLE_MS = 150
+
+# Wheel zoom limit, in screen pixels per pixel of the full-resolution image
+MAX_ZOOM = 5.0
+
 class InteractionMode:
     """Defines the exclusive state of user interaction with the viewer."""
     CROPPING = 1
@@ -19,6 +27,7 @@ class ImageViewer(QWidget):
     Handles loading, displaying, scaling, panning, cropping, splitting, and animations.
     """
     load_requested = Signal(str, bool)
+    progressive_load_requested = Signal(str, bool, QSize, str) # path, force_reload, preview size in device pixels, load channel
     crop_adjustment_started = Signal()
     zoom_state_changed = Signal(bool)
     rotation_finished = Signal(str, float)
@@ -34,7 +43,17 @@ class ImageViewer(QWidget):
         self._loading_path = None
         self.pixmap = QPixmap()
         self.display_pixmap = QPixmap()
+        # On-screen image size. While zoom is in motion display_pixmap is the last
+        # smooth rendering, stretched to this size with a fast transform.
+        self._display_size = QSize()
+        # Progressive loading: a low-res preview is shown until the full image arrives
+        self.progressive_loading = False
+        # Loader channel of this viewer: a new load supersedes its pending ones
+        self.load_channel = f"viewer-{id(self):x}"
+        self._preview_full_size = None # full image size while self.pixmap is a preview
         self.rotation_angle = 0.0
+        self._suggested_rotations = {} # path -> estimated deskew angle the rotate handle starts from
+        self._suggested_layouts = {} # path -> detected split layout awaiting the operator's confirmation
         self.accent_color = QColor("#b0c6ff")
         self.tertiary_color = QColor("#e2bada")
 
@@ -75,6 +94,10 @@ class ImageViewer(QWidget):
         self.zoom_animation.setEasingCurve(QEasingCurve.InOutQuad)
         self.zoom_animation.finished.connect(self._on_zoom_animation_finished)
 
+        self.zoom_settle_timer = QTimer(self)
+        self.zoom_settle_timer.setSingleShot(True)
+        self.zoom_settle_timer.timeout.connect(self._settle_zoom)
+
         self.loading_timer = QTimer(self)
         self.loading_timer.timeout.connect(self._update_loading_animation)
 
@@ -91,7 +114,10 @@ class ImageViewer(QWidget):
 
     def set_zoom_level(self, level):
         self._zoom_level = level
-        self._update_display_pixmap()
+        if self._is_zoom_in_motion():
+            self._update_display_size()
+        else:
+            self._update_display_pixmap()
         self._clamp_pan_offset()
         self.update()
 
@@ -103,10 +129,17 @@ class ImageViewer(QWidget):
         self.accent_color = QColor(primary_hex)
         self.tertiary_color = QColor(tertiary_hex)
 
+    def set_progressive_loading(self, enabled: bool, channel: str = None):
+        """Requests loads through progressive_load_requested (preview first, then full resolution)."""
+        self.progressive_loading = enabled
+        if channel:
+            self.load_channel = channel
+
     def clear_image(self):
         """Clears the currently displayed image and resets state."""
         self.image_path = None
         self._loading_path = None
+        self._preview_full_size = None
         self.is_loading = False
         self.loading_timer.stop()
         self.pixmap = QPixmap()
@@ -123,6 +156,7 @@ class ImageViewer(QWidget):
 
         self.pixmap = QPixmap()
         self.display_pixmap = QPixmap()
+        self._preview_full_size = None
         
         if show_loading_animation:
             self.is_loading = True
@@ -132,9 +166,22 @@ class ImageViewer(QWidget):
         
         if path is None:
             self.on_image_loaded(None, QPixmap())
+        elif self.progressive_loading:
+            dpr = self.devicePixelRatioF()
+            preview_size = QSize(math.ceil(self.width() * dpr), math.ceil(self.height() * dpr))
+            self.progressive_load_requested.emit(path, force_reload, preview_size, self.load_channel)
         else:
             self.load_requested.emit(path, force_reload)
 
+    @Slot(str, QPixmap, QSize)
+    def on_preview_loaded(self, path, pixmap, full_size):
+        """First stage of a progressive load; ignored once the full image is on screen."""
+        if path != self._loading_path or pixmap.isNull() or (self.image_path == path and self._preview_full_size is None):
+            return
+        self._show_loaded_image(path, pixmap)
+        self._loading_path = path # Still waiting for the full-resolution stage
+        self._preview_full_size = QSize(full_size)
+
     @Slot(str, QPixmap)
     def on_image_loaded(self, path, pixmap):
         self.is_loading = False
@@ -142,10 +189,21 @@ class ImageViewer(QWidget):
 
         if path != self._loading_path:
             return
-            
+
+        if self._preview_full_size is not None and path == self.image_path and not pixmap.isNull():
+            self._swap_in_full_resolution(pixmap)
+            return
+
+        self._show_loaded_image(path, pixmap)
+
+    def _show_loaded_image(self, path, pixmap):
+        self.is_loading = False
+        self.loading_timer.stop()
+
         self.pixmap = pixmap
         self.image_path = path 
         self._loading_path = None 
+        self._preview_full_size = None
         self.rotation_angle = 0
 
         pending_layout = self._pending_layout_ratios
@@ -158,8 +216,32 @@ class ImageViewer(QWidget):
                 if pending_layout:
                     self.set_layout_ratios(pending_layout)
                 else:
-                    self._initialize_default_layout()
+                    self._initialize_split_layout()
             self._start_scan_line_animation()
+
+    def _swap_in_full_resolution(self, pixmap):
+        """
+        Replaces the preview with the full image at the same on-screen size, so
+        crop, split and layout rectangles (kept in widget space), zoom and pan
+        all stay exactly where the operator left them.
+        """
+        scale = self.pixmap.width() / pixmap.width() if pixmap.width() else 1.0
+        self.pixmap = pixmap
+        self._loading_path = None
+        self._preview_full_size = None
+        self._zoom_level *= scale
+        if self.zoom_animation.state() == QPropertyAnimation.Running:
+            # Keep a running double-click zoom heading for the same on-screen size
+            # (changing the values re-applies the current zoom, now in full-image units)
+            self.zoom_animation.setStartValue(self.zoom_animation.startValue() * scale)
+            self.zoom_animation.setEndValue(self.zoom_animation.endValue() * scale)
+        self._update_display_pixmap()
+
+    def _max_zoom(self):
+        """MAX_ZOOM in units of the current pixmap, which may still be a reduced preview."""
+        if self._preview_full_size is not None and self.pixmap.width():
+            return MAX_ZOOM * self._preview_full_size.width() / self.pixmap.width()
+        return MAX_ZOOM
     
     # --- View and State Management ---
     def reset_view(self):
@@ -210,6 +292,10 @@ class ImageViewer(QWidget):
         
         self.update()
         
+    def suggest_rotation(self, path, angle):
+        """Presets the rotate handle of `path` to an estimated deskew angle."""
+        self._suggested_rotations[path] = angle
+
     def set_rotating_mode(self, enabled):
         if self.pixmap.isNull(): return
 
@@ -223,6 +309,9 @@ class ImageViewer(QWidget):
             fit_zoom = min(self.width() / self.pixmap.width(), self.height() / self.pixmap.height())
             self.set_zoom_level(fit_zoom)
             self.crop_rect_widget = QRect()
+            if self.image_path in self._suggested_rotations:
+                # Used once: after the rotation is applied it no longer fits the page
+                self.rotation_angle = self._suggested_rotations.pop(self.image_path)
         else:
             self.rotation_angle = 0.0
             self._enter_cropping_mode()
@@ -234,8 +323,9 @@ class ImageViewer(QWidget):
         pixmap_rect = self._get_pixmap_rect_in_widget()
         if pixmap_rect.width() == 0: return None
         
-        scale_w = self.pixmap.width() / pixmap_rect.width()
-        scale_h = self.pixmap.height() / pixmap_rect.height()
+        image_size = self._image_size()
+        scale_w = image_size.width() / pixmap_rect.width()
+        scale_h = image_size.height() / pixmap_rect.height()
         
         img_x = int((self.crop_rect_widget.x() - pixmap_rect.x()) * scale_w)
         img_y = int((self.crop_rect_widget.y() - pixmap_rect.y()) * scale_h)
@@ -246,7 +336,7 @@ class ImageViewer(QWidget):
 
     def get_split_x_in_image_space(self):
         if self.pixmap.isNull(): return None
-        return int(self.split_line_x_ratio * self.pixmap.width())
+        return int(self.split_line_x_ratio * self._image_size().width())
 
     def set_page_splitting_mode(self, enabled):
         if enabled:
@@ -260,12 +350,26 @@ class ImageViewer(QWidget):
                     self.set_layout_ratios(self._pending_layout_ratios)
                     self._pending_layout_ratios = None
                 else:
-                    self._initialize_default_layout()
+                    self._initialize_split_layout()
         else:
             self.interaction_mode = InteractionMode.CROPPING
             self.reset_view()
         self.update()
 
+    def suggest_layout(self, path, layout_data):
+        """Starts the page split handles of `path` from a detected layout the operator still has to confirm."""
+        self._suggested_layouts[path] = layout_data
+        if path == self.image_path and self.interaction_mode == InteractionMode.PAGE_SPLITTING and not self.pixmap.isNull():
+            self.set_layout_ratios(layout_data)
+            self.update()
+
+    def _initialize_split_layout(self):
+        suggested = self._suggested_layouts.get(self.image_path)
+        if suggested:
+            self.set_layout_ratios(suggested)
+        else:
+            self._initialize_default_layout()
+
     def set_layout_ratios(self, layout_data):
         if self.pixmap.isNull():
             self._pending_layout_ratios = layout_data
@@ -347,7 +451,10 @@ class ImageViewer(QWidget):
             painter.rotate(self.rotation_angle)
             painter.translate(-center)
 
-            painter.drawPixmap(pixmap_rect_unrotated.toRect(), self.display_pixmap)
+            # display_pixmap is the screen-sized proxy: fast while the handle is
+            # dragged, filtered once it is released
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, not self.is_dragging_rotate_handle)
+            painter.drawPixmap(pixmap_rect_unrotated, self.display_pixmap, QRectF(self.display_pixmap.rect()))
             painter.restore()
 
             self._draw_rotation_ui(painter, pixmap_rect_unrotated)
@@ -366,6 +473,7 @@ class ImageViewer(QWidget):
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        self.zoom_settle_timer.start(ZOOM_SETTLE_MS)
         self.reset_view()
 
     def wheelEvent(self, event):
@@ -392,7 +500,8 @@ class ImageViewer(QWidget):
             self.zoom_state_changed.emit(False)
             self._enter_cropping_mode()
         else:
-            self.set_zoom_level(min(new_zoom, 5.0)) # Clamp max zoom
+            self.zoom_settle_timer.start(ZOOM_SETTLE_MS)
+            self.set_zoom_level(min(new_zoom, self._max_zoom())) # Clamp max zoom
 
         self.update()
         
@@ -410,6 +519,7 @@ class ImageViewer(QWidget):
         self.interaction_mode = InteractionMode.PANNING if self.is_zoomed else InteractionMode.CROPPING
 
         self.zoom_animation.stop()
+        self.zoom_settle_timer.start(ZOOM_SETTLE_MS) # Covers the first frame, applied before the animation reports Running
         self.zoom_animation.setStartValue(start_zoom)
         self.zoom_animation.setEndValue(end_zoom)
         self.zoom_animation.start()
@@ -515,6 +625,10 @@ class ImageViewer(QWidget):
             self.is_dragging_split_line = False
 
     # --- Private Helper Methods ---
+    def _image_size(self):
+        """Size of the image on disk, even while a progressive preview is displayed."""
+        return self._preview_full_size if self._preview_full_size is not None else self.pixmap.size()
+
     def _initialize_default_layout(self):
         pixmap_rect = self._get_pixmap_rect_in_widget()
         if pixmap_rect.isEmpty():
@@ -551,22 +665,10 @@ class ImageViewer(QWidget):
             self.page_split_handles[f'{prefix}_right'] = QRectF(r.right() - s2, r.center().y() - s2, s, s)
 
     def _calculate_rotation_zoom(self):
-        if self.pixmap.isNull() or self.rotation_angle == 0:
+        if self.pixmap.isNull():
             return 1.0
-
-        w = self.pixmap.width()
-        h = self.pixmap.height()
-        angle_rad = abs(math.radians(self.rotation_angle))
-        
-        if w <= 0 or h <= 0: return 1.0
-
-        cosa = math.cos(angle_rad)
-        sina = math.sin(angle_rad)
-
-        zoom_factor_w = cosa + (h / w) * sina if w > 0 else 1
-        zoom_factor_h = (w / h) * sina + cosa if h > 0 else 1
-        
-        return max(zoom_factor_w, zoom_factor_h)
+        image_size = self._image_size()
+        return rotation_zoom(image_size.width(), image_size.height(), self.rotation_angle)
 
     def _enter_cropping_mode(self):
         if self.pixmap.isNull(): return
@@ -580,19 +682,39 @@ class ImageViewer(QWidget):
         if not self.is_zoomed and self.interaction_mode not in [InteractionMode.SPLITTING, InteractionMode.ROTATING]:
             self.pan_offset = QPointF()
             self._enter_cropping_mode()
+        self._settle_zoom()
+
+    def _is_zoom_in_motion(self):
+        """True while the zoom animation runs or wheel/resize steps are still arriving."""
+        if self.display_pixmap.isNull():
+            return False # Nothing to stretch yet
+        return self.zoom_animation.state() == QPropertyAnimation.Running or self.zoom_settle_timer.isActive()
+
+    def _settle_zoom(self):
+        """One high-quality rescale once zooming has come to rest."""
+        if self._is_zoom_in_motion():
+            return
+        if self.display_pixmap.size() != self._display_size:
             self._update_display_pixmap()
 
+    def _update_display_size(self):
+        """Fast path: only moves the on-screen rectangle; paintEvent stretches the current rendering into it."""
+        scaled_size = self.pixmap.size() * self._zoom_level
+        self._display_size = self.pixmap.size().scaled(scaled_size, Qt.KeepAspectRatio)
+        self.update()
+
     def _update_display_pixmap(self):
         if self.pixmap.isNull():
             self.display_pixmap = QPixmap()
         else:
             scaled_size = self.pixmap.size() * self._zoom_level
             self.display_pixmap = self.pixmap.scaled(scaled_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._display_size = self.display_pixmap.size()
         self.update()
 
     def _get_pixmap_rect_in_widget(self):
         if self.display_pixmap.isNull(): return QRectF()
-        pixmap_size = self.display_pixmap.size()
+        pixmap_size = self._display_size
         widget_size = self.size()
         x = (widget_size.width() - pixmap_size.width()) / 2.0
         y = (widget_size.height() - pixmap_size.height()) / 2.0
@@ -608,7 +730,7 @@ class ImageViewer(QWidget):
             self.pan_offset = QPointF()
             return
             
-        pixmap_size = self.display_pixmap.size()
+        pixmap_size = self._display_size
         widget_size = self.size()
         overhang_x = max(0, (pixmap_size.width() - widget_size.width()) / 2.0)
         overhang_y = max(0, (pixmap_size.height() - widget_size.height()) / 2.0)
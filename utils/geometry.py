@@ -0,0 +1,30 @@
+import math
+
+def rotation_zoom(width, height, angle):
+    """
+    Zoom that makes a page rotated by `angle` degrees cover its original frame,
+    so the center crop back to width x height has no empty corners.
+    Shared by the live rotation preview and ScannerWorker.rotate_and_crop so
+    that what the operator sees is what gets saved.
+    """
+    if width <= 0 or height <= 0 or angle == 0:
+        return 1.0
+    rads = math.radians(angle)
+    cos_a, sin_a = abs(math.cos(rads)), abs(math.sin(rads))
+    return max(cos_a + (height / width) * sin_a, (width / height) * sin_a + cos_a)
+
+def rotate_crop_matrix(width, height, angle):
+    """
+    Inverse affine (a, b, c, d, e, f) for Image.transform(..., Image.AFFINE):
+    output pixel (x, y) of the rotated, zoomed and center-cropped page samples
+    the source at (a*x + b*y + c, d*x + e*y + f). Positive angles turn the page
+    clockwise on screen, like QPainter.rotate().
+    """
+    zoom = rotation_zoom(width, height, angle)
+    rads = math.radians(angle)
+    cos_a, sin_a = math.cos(rads) / zoom, math.sin(rads) / zoom
+    cx, cy = width / 2.0, height / 2.0
+    return (
+        cos_a, sin_a, cx - cos_a * cx - sin_a * cy,
+        -sin_a, cos_a, cy + sin_a * cx - cos_a * cy,
+    )
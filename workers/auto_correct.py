@@ -0,0 +1,146 @@
+import math
+import numpy as np
+
+# Long edge of the proxy the corrections are estimated on
+PROXY_SIZE = 1024
+
+# Share of darkest / brightest proxy pixels clipped by the levels stretch
+CLIP_LOW = 0.005
+CLIP_HIGH = 0.005
+
+# Pixels above this luminance percentile are taken as bare paper for white balance
+PAPER_PERCENTILE = 90
+
+# Key of the template's CDFs in AppConfig.lighting_standard_metrics
+TEMPLATE_CDFS_KEY = "channel_cdfs"
+
+# Limits that keep a page dominated by a coloured plate from being "corrected" into grey
+MAX_GAIN = 1.25
+MIN_LEVELS_RANGE = 64
+
+def _luma(proxy):
+    return proxy if proxy.ndim == 2 else proxy @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+def _cdf(plane):
+    hist = np.bincount(np.clip(plane, 0, 255).astype(np.uint8).ravel(), minlength=256)
+    return np.cumsum(hist) / max(1, hist.sum())
+
+def proxy_of(img):
+    """Box-reduced copy of img whose long edge is about PROXY_SIZE (img itself if already small)."""
+    factor = max(img.width, img.height) // PROXY_SIZE
+    return img.reduce(factor) if factor >= 2 else img
+
+def estimate_levels(proxy: np.ndarray):
+    """
+    Black and white points of the page from its luminance histogram, clipping
+    CLIP_LOW / CLIP_HIGH of the pixels. One pair for all channels, so the
+    stretch does not shift colours. Returns (black, white) or None when the
+    page is already using the range (or is too flat to stretch safely).
+    """
+    cdf = _cdf(_luma(proxy))
+    black = int(np.searchsorted(cdf, CLIP_LOW))
+    white = int(np.searchsorted(cdf, 1.0 - CLIP_HIGH))
+    if white - black < MIN_LEVELS_RANGE or (black <= 0 and white >= 255):
+        return None
+    return black, white
+
+def estimate_white_balance(proxy: np.ndarray):
+    """
+    Per-channel gains that make the paper neutral: the brightest PAPER_PERCENTILE
+    pixels are assumed to be unprinted paper, and each channel is scaled so
+    their mean matches the brightest channel's. Returns (r, g, b) gains.
+    """
+    if proxy.ndim == 2:
+        return 1.0, 1.0, 1.0
+    pixels = proxy.reshape(-1, 3).astype(np.float32)
+    luma = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    paper = pixels[luma >= np.percentile(luma, PAPER_PERCENTILE)]
+    if len(paper) == 0:
+        return 1.0, 1.0, 1.0
+    means = np.maximum(paper.mean(axis=0), 1.0)
+    gains = np.clip(means.max() / means, 1.0, MAX_GAIN)
+    return tuple(float(g) for g in gains)
+
+def channel_cdfs(proxy: np.ndarray) -> dict:
+    """Normalised cumulative histograms of a proxy: "R", "G", "B" (colour only) and luminance "L"."""
+    cdfs = {"L": _cdf(_luma(proxy))}
+    if proxy.ndim == 3:
+        for index, band in enumerate("RGB"):
+            cdfs[band] = _cdf(proxy[..., index])
+    return cdfs
+
+def template_metrics(proxy: np.ndarray) -> dict:
+    """The lighting standard as stored in AppConfig.lighting_standard_metrics."""
+    cdfs = channel_cdfs(proxy)
+    return {TEMPLATE_CDFS_KEY: {band: [round(float(v), 6) for v in cdf] for band, cdf in cdfs.items()}}
+
+def template_cdfs(metrics):
+    """CDFs of a stored lighting standard, or None if there is none (or only an old template image)."""
+    cdfs = (metrics or {}).get(TEMPLATE_CDFS_KEY)
+    if not cdfs:
+        return None
+    return {band: np.asarray(cdf, dtype=np.float64) for band, cdf in cdfs.items()}
+
+def match_luts(source_cdfs: dict, target_cdfs: dict, bands):
+    """
+    Histogram matching: for each band, the table that maps every level onto the
+    template level of equal rank, i.e. the first level where the template's CDF
+    reaches the source CDF at the middle of that level's bin.
+    """
+    luts = []
+    for band in bands:
+        cdf = source_cdfs[band]
+        ranks = (cdf + np.concatenate(([0.0], cdf[:-1]))) / 2
+        luts.append(np.minimum(np.searchsorted(target_cdfs[band], ranks), 255).astype(np.float32))
+    return luts
+
+def build_luts(bands: int, levels=None, gains=(1.0, 1.0, 1.0), matches=None):
+    """
+    One 256-entry table per band combining white balance gains with either the
+    levels stretch or the histogram-matching tables (which map gained values).
+    """
+    x = np.arange(256, dtype=np.float32)
+    luts = []
+    for band in range(bands):
+        y = x * gains[band] if bands == 3 else x.copy()
+        if matches is not None:
+            y = np.interp(y, x, matches[band])
+        elif levels is not None:
+            black, white = levels
+            y = (y - black) * (255.0 / (white - black))
+        luts.append(np.clip(np.rint(y), 0, 255).astype(np.uint8))
+    return np.concatenate(luts)
+
+def auto_correct(img, lighting: bool = True, color: bool = True, template=None):
+    """
+    Returns the corrected image, or None if nothing needed changing. Estimates
+    on a proxy with NumPy, then applies everything at full resolution in one
+    per-channel lookup (Image.point) without full-frame float copies.
+    With a lighting standard (template_cdfs()), lighting correction matches the
+    page's histograms to it instead of stretching its levels, so every page of
+    a book gets the same exposure. Without colour correction only luminance is
+    matched, with one table shared by all channels.
+    """
+    if img.mode not in ("RGB", "L") or not (lighting or color):
+        return None
+    proxy = np.asarray(proxy_of(img), dtype=np.float32)
+
+    gains = estimate_white_balance(proxy) if color else (1.0, 1.0, 1.0)
+    levels = matches = None
+    if lighting:
+        # Measured after white balance, as they will be applied
+        balanced = proxy * np.asarray(gains, dtype=np.float32) if proxy.ndim == 3 else proxy
+        if template is not None:
+            bands = img.getbands()
+            if color:
+                matches = match_luts(channel_cdfs(balanced), template, bands)
+            else:
+                # Per-channel matching would also impose the template's colour balance
+                matches = match_luts(channel_cdfs(balanced), template, "L") * len(bands)
+        else:
+            levels = estimate_levels(balanced)
+    if levels is None and matches is None and all(math.isclose(g, 1.0, abs_tol=0.01) for g in gains):
+        return None
+
+    luts = build_luts(len(img.getbands()), levels, gains, matches)
+    return img.point(luts.tolist())
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from digipage.core.config import BACKUP_DIR
+from digipage.workers.file_readiness import replace_file, temp_path_for
+
+try:
+    import fcntl
+except ImportError:  # Windows: hardlinks or copies only
+    fcntl = None
+
+# Linux FICLONE ioctl: copy-on-write clone on btrfs, XFS, bcachefs...
+FICLONE = 0x40049409
+
+# Backups of pages that never reach a transferred book (deleted scans, abandoned
+# sessions) are dropped after this long
+RETENTION_DAYS = 14
+
+INDEX_FILE = "index.json"
+
+# When the store is on another filesystem than a page, the page is linked into
+# this hidden folder next to it instead, and copied over in the background
+LOCAL_STAGING_DIR = ".backup_staging"
+
+class BackupStore:
+    """
+    Content-addressed store of the originals of edited pages, replacing the flat
+    copies in BACKUP_DIR.
+
+    backup() only takes a hardlink (or a reflink) of the page into a staging
+    directory, which is instant on the edit path. Edits replace pages atomically
+    with a new file, so the link keeps the original bytes. If the store is on
+    another filesystem, the link is staged in LOCAL_STAGING_DIR beside the page.
+    Hashing and filing the object under objects/<sha256> happens on a
+    background thread; identical originals are stored once. A staged link that
+    still shares the page's inode (the edit did not replace the page, or it was
+    staged across filesystems) is reflinked or copied there first, so no stored
+    object is ever the live page's inode. Only where pages cannot be linked at
+    all is the page copied on the edit path.
+
+    The index maps a page's absolute path to its original's hash. It follows
+    pages when a book is created (move()), and entries are released when the
+    book is transferred (release_tree()) or the page is deleted (release()),
+    after which objects nothing refers to any more are deleted. Pages that never
+    make it into a transferred book expire after RETENTION_DAYS. Restoring is a
+    lookup plus a reflink (or copy) back.
+    """
+
+    def __init__(self, root: str, retention_days: float = RETENTION_DAYS):
+        self.root = root
+        self._retention = retention_days * 24 * 3600
+        self._lock = threading.Lock()
+        self._index = None  # abs path -> {"hash": str, "ext": str, "time": float}
+        self._pending = set()  # abs paths staged but not filed yet
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup-store")
+
+    def backup(self, path: str):
+        """Keeps the page's current contents unless an original is already stored for it."""
+        key = os.path.abspath(path)
+        with self._lock:
+            if key in self._load_index() or key in self._pending:
+                return
+            self._pending.add(key)
+        try:
+            staged = self._stage(path)
+        except OSError:
+            with self._lock:
+                self._pending.discard(key)
+            raise
+        self._executor.submit(self._file, key, staged)
+
+    def _stage(self, path):
+        """Links the page into staging, on the page's own filesystem if the store's is another one."""
+        name = uuid.uuid4().hex
+        staging_dir = os.path.join(self.root, "staging")
+        os.makedirs(staging_dir, exist_ok=True)
+        staged = os.path.join(staging_dir, name)
+        if _link(path, staged):
+            return staged
+        local_dir = os.path.join(os.path.dirname(os.path.abspath(path)), LOCAL_STAGING_DIR)
+        try:
+            os.makedirs(local_dir, exist_ok=True)
+            local = os.path.join(local_dir, name)
+            if _link(path, local):
+                return local
+        except OSError:
+            pass
+        shutil.copy2(path, staged)
+        return staged
+
+    def restore(self, path: str) -> bool:
+        """Puts the stored original back in place of the page. Returns False if there is none."""
+        key = os.path.abspath(path)
+        self.flush()
+        with self._lock:
+            entry = self._load_index().get(key)
+        if entry is not None:
+            source = self._object_path(entry["hash"], entry["ext"])
+        else:
+            # Flat copy left by earlier versions
+            source = os.path.join(self.root, os.path.basename(path))
+        if not os.path.isfile(source):
+            return False
+        tmp_path = temp_path_for(path)
+        try:
+            # Not a hardlink: the live page must not share its inode with the stored original
+            _clone(source, tmp_path)
+            replace_file(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def move(self, old_path: str, new_path: str):
+        """Re-keys a page's original after the page itself was moved (e.g. into a book)."""
+        self._executor.submit(self._move, os.path.abspath(old_path), os.path.abspath(new_path))
+
+    def release(self, path: str):
+        """Forgets the original of a deleted page and deletes its object unless another page shares it."""
+        self._executor.submit(self._release, os.path.abspath(path))
+
+    def release_tree(self, folder: str):
+        """Forgets the originals of all pages under folder (a transferred book) and collects garbage."""
+        self._executor.submit(self._release_tree, os.path.join(os.path.abspath(folder), ""))
+
+    def flush(self):
+        """Waits until every queued backup has been filed."""
+        self._executor.submit(lambda: None).result()
+
+    # --- Background thread ---
+
+    def _file(self, key, staged):
+        try:
+            staging_dir = os.path.join(self.root, "staging")
+            if os.path.dirname(staged) != staging_dir or os.stat(staged).st_nlink > 1:
+                # Still the page's inode (not replaced yet), or beside the page on
+                # another filesystem: stored objects get an inode of their own, so
+                # in-place writes to the page can never reach the original
+                private = os.path.join(staging_dir, uuid.uuid4().hex)
+                _clone(staged, private)
+                os.remove(staged)
+                if os.path.basename(os.path.dirname(staged)) == LOCAL_STAGING_DIR:
+                    _remove_empty_dir(os.path.dirname(staged))
+                staged = private
+            digest = _sha256(staged)
+            ext = os.path.splitext(key)[1].lower()
+            target = self._object_path(digest, ext)
+            if os.path.exists(target):
+                os.remove(staged)  # Same content already stored
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(staged, target)
+            with self._lock:
+                self._index.setdefault(key, {"hash": digest, "ext": ext, "time": time.time()})
+                self._save_index()
+        except OSError:
+            # Non-critical, like the flat copies before
+            if os.path.exists(staged):
+                try:
+                    os.remove(staged)
+                except OSError:
+                    pass
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _move(self, old_key, new_key):
+        with self._lock:
+            entry = self._load_index().pop(old_key, None)
+            if entry is not None:
+                self._index[new_key] = entry
+                self._save_index()
+
+    def _release(self, key):
+        with self._lock:
+            index = self._load_index()
+            entry = index.pop(key, None)
+            if entry is None:
+                return
+            self._save_index()
+            shared = any(e["hash"] == entry["hash"] for e in index.values())
+        if not shared:
+            try:
+                os.remove(self._object_path(entry["hash"], entry["ext"]))
+            except OSError:
+                pass
+
+    def _release_tree(self, prefix):
+        with self._lock:
+            index = self._load_index()
+            for key in [k for k in index if k.startswith(prefix)]:
+                del index[key]
+            self._save_index()
+        self._collect()
+
+    def _collect(self):
+        """Drops expired index entries and deletes objects nothing refers to."""
+        cutoff = time.time() - self._retention
+        with self._lock:
+            index = self._load_index()
+            for key in [k for k, e in index.items() if e["time"] < cutoff]:
+                del index[key]
+            self._save_index()
+            live = {e["hash"] for e in index.values()}
+
+        objects_dir = os.path.join(self.root, "objects")
+        for dirpath, _, files in os.walk(objects_dir, topdown=False):
+            for name in files:
+                if os.path.splitext(name)[0] not in live:
+                    try:
+                        os.remove(os.path.join(dirpath, name))
+                    except OSError:
+                        pass
+            if dirpath != objects_dir:
+                try:
+                    os.rmdir(dirpath)  # Only succeeds once empty
+                except OSError:
+                    pass
+
+    # --- Index (caller holds the lock) ---
+
+    def _object_path(self, digest, ext):
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.root, INDEX_FILE), "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        index_path = os.path.join(self.root, INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+def shared_backup_store() -> BackupStore:
+    """
+    The store in BACKUP_DIR that page edits and auto-corrections both file
+    into, created on first use with the directory made absolute then.
+    """
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = BackupStore(os.path.abspath(BACKUP_DIR))
+        return _shared_store
+
+def _link(src, dst, hardlink=True) -> bool:
+    """Hardlink, or failing that reflink, src to dst without copying data. False if neither works."""
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return True
+        except OSError:
+            pass
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+    return False
+
+def _clone(src, dst):
+    """Independent copy of src: a reflink where the filesystem supports it, else a plain copy."""
+    if not _link(src, dst, hardlink=False):
+        shutil.copy2(src, dst)
+
+def _remove_empty_dir(path):
+    try:
+        os.rmdir(path)  # Only succeeds once empty
+    except OSError:
+        pass
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
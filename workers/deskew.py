@@ -0,0 +1,71 @@
+import numpy as np
+
+from digipage.workers.page_layout import load_layout_proxy, otsu_threshold, span_above
+
+# Width of the binarised proxy text lines are measured on
+SKEW_PROXY_WIDTH = 640
+
+# Search range and steps (degrees): a coarse sweep, then a fine one around its best angle
+MAX_SKEW = 5.0
+COARSE_STEP = 0.25
+FINE_STEP = 0.02
+
+# Ink pixels used for the projections (evenly thinned out beyond this)
+MAX_POINTS = 40000
+MIN_POINTS = 500
+
+# Border of the page ignored as a share of its size (bed edges, shadows, page curl)
+PAGE_INSET = 0.03
+
+# Corrections smaller than this are not worth a resample
+MIN_SKEW = 0.1
+
+def _ink_points(proxy):
+    """(x, y) of dark pixels inside the page, thinned out to at most MAX_POINTS."""
+    threshold = otsu_threshold(proxy)
+    paper = proxy > threshold
+    x0, x1 = span_above(paper.mean(axis=0))
+    y0, y1 = span_above(paper[:, x0:x1].mean(axis=1))
+    dx, dy = int((x1 - x0) * PAGE_INSET), int((y1 - y0) * PAGE_INSET)
+    ys, xs = np.nonzero(~paper[y0 + dy:y1 - dy, x0 + dx:x1 - dx])
+    step = max(1, len(xs) // MAX_POINTS)
+    return xs[::step].astype(np.float32), ys[::step].astype(np.float32)
+
+def _profile_scores(xs, ys, angles):
+    """
+    Sharpness of the horizontal projection profile of the points sheared by each
+    angle: the sum of squared bin counts, which peaks when text lines fall into
+    as few rows as possible.
+    """
+    scores = np.empty(len(angles))
+    for i, angle in enumerate(angles):
+        rows = np.rint(ys - xs * np.float32(np.tan(np.radians(angle)))).astype(np.int64)
+        counts = np.bincount(rows - rows.min())
+        scores[i] = np.dot(counts, counts)
+    return scores
+
+def estimate_skew(proxy: np.ndarray):
+    """
+    Skew of the text lines on a grayscale proxy, as (angle, confidence). angle
+    is the correction to pass to ScannerWorker.rotate_and_crop (degrees,
+    positive = clockwise, like the rotate handle). confidence in [0, 1] is how
+    much the best projection stands out from the sweep's median; pages without
+    enough text come out near 0.
+    """
+    xs, ys = _ink_points(proxy)
+    if len(xs) < MIN_POINTS:
+        return 0.0, 0.0
+
+    coarse = np.arange(-MAX_SKEW, MAX_SKEW + COARSE_STEP / 2, COARSE_STEP)
+    scores = _profile_scores(xs, ys, coarse)
+    best = coarse[int(np.argmax(scores))]
+    confidence = float(1.0 - np.median(scores) / scores.max())
+
+    fine = np.arange(best - COARSE_STEP, best + COARSE_STEP + FINE_STEP / 2, FINE_STEP)
+    skew = float(fine[int(np.argmax(_profile_scores(xs, ys, fine)))])
+    # Lines descending to the right are turned back counter-clockwise
+    return round(-skew, 2), confidence
+
+def estimate_skew_file(path):
+    """estimate_skew() of a scan on disk, decoding only a SKEW_PROXY_WIDTH proxy."""
+    return estimate_skew(load_layout_proxy(path, SKEW_PROXY_WIDTH))
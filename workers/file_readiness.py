@@ -0,0 +1,196 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+
+# How often waiters re-check a file when no watcher events arrive for it
+POLL_INTERVAL = 0.25
+
+# Edited pages are written to a temp file beside them and renamed over them
+TEMP_SUFFIX = ".tmp"
+
+# How long an announced in-place replacement waits for the watcher to see its rename
+REPLACE_WINDOW = 30.0
+
+# TIFF tags that locate the image data: StripOffsets/StripByteCounts, TileOffsets/TileByteCounts
+_TIFF_DATA_TAGS = {273: "offsets", 279: "counts", 324: "offsets", 325: "counts"}
+_TIFF_TYPE_SIZES = {3: 2, 4: 4}  # SHORT, LONG
+
+class FileReadiness:
+    """
+    Tells whether a scan file has been completely written, shared by the folder
+    watcher and the image loader.
+
+    The watcher reports inotify close-after-write events (watchdog's on_closed)
+    through mark_closed(); a file closed after its last modification is complete.
+    Where no such event was seen (other platforms, files written before the
+    watcher started) the file's own structure is checked instead: JPEG EOI
+    marker, PNG IEND chunk, TIFF strip/tile extents, BMP header size, GIF trailer.
+    Waiters are woken by watcher events rather than sleeping a fixed interval.
+
+    Pages this process rewrites are announced through replace_file(), so the
+    watcher can tell that rename from a new scan arriving under a temp name.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._closed = {}  # path -> (size, mtime_ns) when the writer closed it
+        self._replacing = {}  # path -> times of announced in-place replacements
+        self._events = 0
+
+    def expect_replace(self, path: str):
+        with self._cond:
+            self._replacing.setdefault(os.path.abspath(path), []).append(time.monotonic())
+
+    def take_replace(self, path: str) -> bool:
+        """True (once per announcement) if this process replaced the existing page at path."""
+        key = os.path.abspath(path)
+        cutoff = time.monotonic() - REPLACE_WINDOW
+        with self._cond:
+            times = [t for t in self._replacing.pop(key, []) if t >= cutoff]
+            if not times:
+                return False
+            if len(times) > 1:
+                self._replacing[key] = times[1:]
+            return True
+
+    def mark_closed(self, path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._cond:
+            self._closed[os.path.abspath(path)] = (st.st_size, st.st_mtime_ns)
+            self._events += 1
+            self._cond.notify_all()
+
+    def mark_modified(self, path: str):
+        with self._cond:
+            self._closed.pop(os.path.abspath(path), None)
+            self._events += 1
+            self._cond.notify_all()
+
+    def forget(self, path: str):
+        with self._cond:
+            self._closed.pop(os.path.abspath(path), None)
+
+    def is_ready(self, path: str) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size == 0:
+            return False
+        with self._cond:
+            closed = self._closed.get(os.path.abspath(path))
+        if closed == (st.st_size, st.st_mtime_ns):
+            return True
+        return is_complete(path, st.st_size)
+
+    def wait_until_ready(self, path: str, timeout: float) -> bool:
+        """Blocks until the file is complete or `timeout` seconds pass. Returns readiness."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                seen = self._events
+            if self.is_ready(path):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._cond:
+                if self._events == seen:
+                    self._cond.wait(min(remaining, POLL_INTERVAL))
+
+# Shared instance: the watcher feeds it, loaders ask it
+file_readiness = FileReadiness()
+
+def temp_path_for(path: str) -> str:
+    """
+    Creates a uniquely named, empty "<page>.<random>.tmp" next to path (same
+    filesystem, so os.replace() stays atomic). Every writer gets its own, so
+    concurrent edits of one page never write into each other's temp file.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=TEMP_SUFFIX, prefix=os.path.basename(path) + ".",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    return tmp_path
+
+def replace_file(tmp_path: str, path: str):
+    """os.replace() of a temp_path_for() file over path, announced to the watcher if it rewrites an existing page."""
+    if os.path.exists(path):
+        file_readiness.expect_replace(path)
+    os.replace(tmp_path, path)
+
+def is_complete(path: str, size: int = None) -> bool:
+    """Format-aware check that the file ends where its own structure says it should."""
+    try:
+        if size is None:
+            size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = f.read(16)
+            if head.startswith(b"\xff\xd8"):
+                return _jpeg_complete(f, size)
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                return _png_complete(f, size)
+            if head[:4] in (b"II*\x00", b"MM\x00*"):
+                return _tiff_complete(f, size, "<" if head[:2] == b"II" else ">")
+            if head.startswith(b"BM") and len(head) >= 6:
+                return struct.unpack("<I", head[2:6])[0] <= size
+            if head.startswith(b"GIF8"):
+                return _tail(f, size, 1) == b"\x3b"
+            # Unknown format: nothing to verify beyond having content
+            return size > 0
+    except (OSError, struct.error):
+        return False
+
+def _tail(f, size, n):
+    if size < n:
+        return b""
+    f.seek(size - n)
+    return f.read(n)
+
+def _jpeg_complete(f, size):
+    # Some cameras append vendor data after EOI, so look for it near the end rather than exactly at it
+    tail = _tail(f, size, min(size, 4096))
+    return b"\xff\xd9" in tail
+
+def _png_complete(f, size):
+    # Like JPEG, some writers leave bytes after the IEND chunk
+    return b"\x00\x00\x00\x00IEND\xaeB`\x82" in _tail(f, size, min(size, 4096))
+
+def _tiff_complete(f, size, order):
+    f.seek(4)
+    ifd = struct.unpack(order + "I", f.read(4))[0]
+    if ifd < 8 or ifd + 2 > size:
+        return False
+    f.seek(ifd)
+    count = struct.unpack(order + "H", f.read(2))[0]
+    if ifd + 2 + count * 12 + 4 > size:
+        return False
+
+    values = {"offsets": [], "counts": []}
+    entries = f.read(count * 12)
+    for i in range(count):
+        tag, typ, n, raw = struct.unpack(order + "HHI4s", entries[i * 12:(i + 1) * 12])
+        if tag not in _TIFF_DATA_TAGS or typ not in _TIFF_TYPE_SIZES:
+            continue
+        item = _TIFF_TYPE_SIZES[typ]
+        fmt = order + ("H" if typ == 3 else "I") * n
+        if n * item <= 4:
+            data = raw[:n * item]
+        else:
+            offset = struct.unpack(order + "I", raw)[0]
+            if offset + n * item > size:
+                return False
+            pos = f.tell()
+            f.seek(offset)
+            data = f.read(n * item)
+            f.seek(pos)
+        values[_TIFF_DATA_TAGS[tag]] = struct.unpack(fmt, data)
+
+    offsets, counts = values["offsets"], values["counts"]
+    if not offsets or len(offsets) != len(counts):
+        return True  # No strip layout to verify; the IFD itself is intact
+    return max(o + c for o, c in zip(offsets, counts)) <= size
@@ -0,0 +1,179 @@
+import os
+import threading
+from collections import OrderedDict
+
+def file_fingerprint(path: str):
+    """(size, mtime_ns, inode) of the file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+class ImageCache:
+    """
+    Two-tier LRU cache for the image loader, bounded by bytes instead of entry count.
+
+    - Hot tier: decoded images (QPixmap/QImage) keyed by (path, kind).
+    - Warm tier: the compressed file bytes keyed by path, so an image evicted
+      from the hot tier costs a decode on the next visit but not a disk read.
+
+    Entries can carry the file_fingerprint() of the file they were read from.
+    Lookups that pass the current fingerprint drop entries whose file has since
+    been edited, replaced or deleted, so callers never need to invalidate by hand.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, hot_budget_bytes: int, warm_budget_bytes: int = 0):
+        self._lock = threading.RLock()
+        self._hot = OrderedDict()   # key -> (value, nbytes, fingerprint)
+        self._warm = OrderedDict()  # path -> (bytes, fingerprint)
+        self._hot_bytes = 0
+        self._warm_bytes = 0
+        self._hot_budget = max(0, int(hot_budget_bytes))
+        self._warm_budget = max(0, int(warm_budget_bytes))
+        self._counters = dict.fromkeys(
+            ("hits", "misses", "evictions", "stale", "warm_hits", "warm_misses", "warm_evictions"), 0
+        )
+
+    # --- Hot tier ---
+
+    def get(self, key, fingerprint=None):
+        return self.get_first((key,), fingerprint)[1]
+
+    def get_first(self, keys, fingerprint=None):
+        """
+        Looks up keys in order of preference; counts as a single hit or miss. Returns (key, value).
+        With a fingerprint, entries stored for a different version of the file are dropped.
+        """
+        with self._lock:
+            for key in keys:
+                entry = self._valid_hot(key, fingerprint)
+                if entry is not None:
+                    self._hot.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return key, entry[0]
+            self._counters["misses"] += 1
+            return None, None
+
+    def put(self, key, value, nbytes: int, pinned=None, fingerprint=None) -> bool:
+        """
+        Stores a decoded image, evicting least recently used entries.
+        Entries whose path is in `pinned` are never evicted to make room; if the
+        image cannot fit without evicting them it is not stored and False is returned.
+        """
+        with self._lock:
+            self._pop_hot(key)
+            if nbytes > self._hot_budget:
+                return False
+            self._hot[key] = (value, nbytes, fingerprint)
+            self._hot_bytes += nbytes
+            self._evict_hot(pinned)
+            if self._hot_bytes > self._hot_budget:
+                self._pop_hot(key)
+                return False
+            return True
+
+    def contains(self, key, fingerprint=None) -> bool:
+        with self._lock:
+            return self._valid_hot(key, fingerprint) is not None
+
+    # --- Warm tier ---
+
+    def get_bytes(self, path: str, fingerprint=None):
+        with self._lock:
+            entry = self._warm.get(path)
+            if entry is not None and fingerprint is not None and entry[1] != fingerprint:
+                self._pop_warm(path)
+                self._counters["stale"] += 1
+                entry = None
+            if entry is None:
+                self._counters["warm_misses"] += 1
+                return None
+            self._warm.move_to_end(path)
+            self._counters["warm_hits"] += 1
+            return entry[0]
+
+    def put_bytes(self, path: str, data: bytes, fingerprint=None) -> bool:
+        with self._lock:
+            self._pop_warm(path)
+            if len(data) > self._warm_budget:
+                return False
+            self._warm[path] = (data, fingerprint)
+            self._warm_bytes += len(data)
+            self._evict_warm()
+            return True
+
+    # --- Maintenance ---
+
+    def discard(self, paths):
+        """Drops every tier's entries for the given file paths."""
+        paths = set(paths)
+        with self._lock:
+            for key in [k for k in self._hot if k[0] in paths]:
+                self._pop_hot(key)
+            for path in paths:
+                self._pop_warm(path)
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            self._warm.clear()
+            self._hot_bytes = 0
+            self._warm_bytes = 0
+
+    def set_budget(self, hot_budget_bytes: int, warm_budget_bytes: int):
+        with self._lock:
+            self._hot_budget = max(0, int(hot_budget_bytes))
+            self._warm_budget = max(0, int(warm_budget_bytes))
+            self._evict_hot()
+            self._evict_warm()
+
+    def stats(self) -> dict:
+        """Snapshot of hit/miss/eviction counters and current memory use."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(
+                entries=len(self._hot), bytes=self._hot_bytes, budget=self._hot_budget,
+                warm_entries=len(self._warm), warm_bytes=self._warm_bytes, warm_budget=self._warm_budget,
+            )
+            return stats
+
+    def _valid_hot(self, key, fingerprint):
+        entry = self._hot.get(key)
+        if entry is not None and fingerprint is not None and entry[2] != fingerprint:
+            self._pop_hot(key)
+            self._counters["stale"] += 1
+            return None
+        return entry
+
+    def _evict_hot(self, pinned=None):
+        if not pinned:
+            while self._hot_bytes > self._hot_budget and self._hot:
+                _, (_, nbytes, _) = self._hot.popitem(last=False)
+                self._hot_bytes -= nbytes
+                self._counters["evictions"] += 1
+            return
+        for key in list(self._hot):
+            if self._hot_bytes <= self._hot_budget:
+                break
+            if key[0] not in pinned:
+                self._pop_hot(key)
+                self._counters["evictions"] += 1
+
+    def _pop_hot(self, key):
+        entry = self._hot.pop(key, None)
+        if entry is not None:
+            self._hot_bytes -= entry[1]
+
+    def _evict_warm(self):
+        while self._warm_bytes > self._warm_budget:
+            _, (old, _) = self._warm.popitem(last=False)
+            self._warm_bytes -= len(old)
+            self._counters["warm_evictions"] += 1
+
+    def _pop_warm(self, path):
+        entry = self._warm.pop(path, None)
+        if entry is not None:
+            self._warm_bytes -= len(entry[0])
@@ -1,83 +1,511 @@
+import io
 import os
-import time
-from collections import OrderedDict
+import math
+from collections import deque
 from PIL import Image
-from PIL.ImageQt import ImageQt
-from PySide6.QtCore import QObject, Signal, Slot
-from PySide6.QtGui import QPixmap
+from PySide6.QtCore import QObject, Signal, Slot, QSize, QRunnable, QThreadPool
+from PySide6.QtGui import QPixmap, QImage
+
+from digipage.workers.auto_correct import auto_correct, template_cdfs
+from digipage.workers.backup_store import shared_backup_store
+from digipage.workers.file_readiness import file_readiness
+from digipage.workers.image_cache import ImageCache, file_fingerprint
+from digipage.workers.jpeg_lossless import save_like
+from digipage.workers.mapped_raster import MappedRaster
+from digipage.workers.preview_store import PreviewStore
+from digipage.workers.sharpen import unsharp_mask
+
+# Cache key suffixes: full-resolution pixmaps vs. viewport-sized previews
+FULL = "full"
+PREVIEW = "preview"
+
+# QThreadPool priorities: visible pages always jump the prefetch queue
+VISIBLE_PRIORITY = 10
+PREFETCH_PRIORITY = 0
+
+MB = 1024 * 1024
+
+# How long a load waits for a file the scanner is still writing
+READY_TIMEOUT = 3.0
+
+# Auto-corrections redone from scratch when the page is edited while being corrected
+CORRECT_ATTEMPTS = 2
+
+# Pillow modes Qt can display as-is: mode -> (QImage format, bytes per pixel)
+_QT_FORMATS = {
+    "RGB": (QImage.Format_RGB888, 3),
+    "L": (QImage.Format_Grayscale8, 1),
+    "RGBA": (QImage.Format_RGBA8888, 4),
+}
+
+def _pixmap_nbytes(pixmap: QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+def pil_to_qimage(pil_img) -> QImage:
+    """
+    Wraps decoded Pillow pixels in a QImage of the matching native Qt format.
+    Unlike ImageQt this does not expand RGB/L scans to RGBA and copies the
+    pixels only once (tobytes); the QImage reads straight from that buffer,
+    which is kept on the QImage for its lifetime.
+    """
+    if pil_img.mode not in _QT_FORMATS:
+        if pil_img.mode == "1":
+            target = "L"
+        elif "A" in pil_img.getbands() or "transparency" in pil_img.info:
+            target = "RGBA"
+        else:
+            target = "RGB"
+        pil_img = pil_img.convert(target)
+    fmt, bpp = _QT_FORMATS[pil_img.mode]
+    data = pil_img.tobytes()
+    q_image = QImage(data, pil_img.width, pil_img.height, pil_img.width * bpp, fmt)
+    q_image._buffer = data
+    return q_image
+
+class _DecodeTask(QRunnable):
+    """
+    Decodes one file on the pool and hands the QImage back to the worker's thread.
+    `channels` are the display slots (e.g. "left", "right") still waiting for
+    the result; a task nobody waits for any more is cancelled before it decodes.
+    `fingerprint` is the file's version when the task was queued; the result is
+    cached under it, so an edit made during the decode invalidates it on the next lookup.
+    """
+    def __init__(self, worker, path, target_size, prefetch, fingerprint):
+        super().__init__()
+        self.worker = worker
+        self.path = path
+        self.target_size = target_size
+        self.prefetch = prefetch
+        self.fingerprint = fingerprint
+        self.channels = set()
+        self.cancelled = False
+
+    def run(self):
+        if self.cancelled:
+            self.worker._decoded.emit(self, None, None, "")
+            return
+        try:
+            q_image, full_size = self.worker._decode_image(self.path, self.target_size)
+            self.worker._decoded.emit(self, q_image, full_size, "")
+        except Exception as e:
+            self.worker._decoded.emit(self, None, None, str(e))
+
+class _CorrectTask(QRunnable):
+    """
+    Auto lighting / colour correction and sharpening of one scan, saved back in
+    place after its original was backed up. If the page is edited (cropped,
+    rotated, split) while it is being corrected, the correction starts over
+    from the edited page instead of overwriting the edit.
+    """
+    def __init__(self, worker, path, lighting, color, sharpen, template):
+        super().__init__()
+        self.worker = worker
+        self.path = path
+        self.lighting = lighting
+        self.color = color
+        self.sharpen = sharpen
+        self.template = template
+
+    def run(self):
+        try:
+            # Decoded even if the check timed out; a truly partial file fails below
+            file_readiness.wait_until_ready(self.path, READY_TIMEOUT)
+            for attempt in range(CORRECT_ATTEMPTS):
+                fingerprint = file_fingerprint(self.path)
+                with Image.open(self.path) as source:
+                    source.load()
+                    corrected = auto_correct(source, self.lighting, self.color, self.template)
+                    if self.sharpen:
+                        sharpened = unsharp_mask(corrected if corrected is not None else source)
+                        corrected = sharpened if sharpened is not None else corrected
+                if corrected is None:
+                    break
+                shared_backup_store().backup(self.path)
+                if save_like(corrected, source, self.path, fingerprint):
+                    break
+            else:
+                return # Still being edited; leave the operator's version alone
+            self.worker.processing_complete.emit(self.path)
+        except Exception as e:
+            self.worker.error_occurred.emit(f"Failed to auto-correct image {os.path.basename(self.path)}: {e}")
 
 class ImageWorker(QObject):
     """
     Background worker responsible for loading images from disk into QPixmaps
-    for the UI. Handles caching to improve performance.
+    for the UI. Handles caching to improve performance: decoded pixmaps and
+    the compressed file bytes are kept in a byte-budgeted ImageCache.
+
+    Decoding runs on a QThreadPool (Pillow releases the GIL while decoding), so
+    both pages of a spread and any prefetches decode on separate cores. Only the
+    QImage -> QPixmap conversion and signal delivery happen on the thread this
+    object lives in, which can therefore be the GUI thread.
+
+    When a target size is given, only as many pixels as needed to fill it are
+    decoded (JPEG draft scaling / integer reduce) and the result is delivered
+    through preview_loaded together with the full image size.
+
+    Cache entries are validated against the file's (size, mtime_ns, inode) on
+    every lookup, so edited, replaced or deleted scans reload by themselves and
+    callers do not have to invalidate paths before file operations. Previews are also
+    written to an optional on-disk PreviewStore, which is consulted before decoding
+    so that reopening a book does not decode every scan again.
+
+    Loads can be tagged with a channel (one per canvas). A new load on a channel
+    supersedes the previous one: if that decode has not started yet it is skipped
+    when its turn comes. Requests for a page that is already being decoded join the
+    running decode instead of starting a second one.
     """
     image_loaded = Signal(str, QPixmap)
+    preview_loaded = Signal(str, QPixmap, QSize) # path, reduced pixmap, full image size
     error_occurred = Signal(str)
+    processing_complete = Signal(str) # path of an auto-corrected scan
 
-    def __init__(self, caching_enabled=True):
+    # Internal: pool thread -> worker thread hand-off (task, QImage, full size, error)
+    _decoded = Signal(object, object, object, str)
+
+    def __init__(self, caching_enabled=True, cache_budget_mb=1024, compressed_cache_budget_mb=256, decode_workers=4,
+                 preview_store_dir=None, preview_store_budget_mb=2048, correct_workers=2):
         super().__init__()
-        self._cache = OrderedDict()
+        self._cache = ImageCache(cache_budget_mb * MB, compressed_cache_budget_mb * MB)
+        self._store = PreviewStore(preview_store_dir, preview_store_budget_mb * MB) if preview_store_dir else None
         self._caching_enabled = caching_enabled
-        self.CACHE_LIMIT = 20
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, decode_workers))
+        # Auto-corrections get their own pool so a burst of scans never delays visible decodes
+        self._correct_pool = QThreadPool(self)
+        self._correct_pool.setMaxThreadCount(max(1, correct_workers))
+        self._lighting_template = None # per-channel CDFs of the lighting standard
+        self._prefetch_queue = deque()
+        self._prefetch_window = set()
+        self._prefetch_target = None
+        self._prefetch_in_flight = 0
+        self._in_flight = {} # path -> _DecodeTask
+        self._channels = {} # channel -> _DecodeTasks the channel is waiting for
+        self._decoded.connect(self._on_decoded)
 
     @Slot(bool)
     def set_caching(self, enabled: bool):
         self._caching_enabled = enabled
         if not enabled:
             self._cache.clear()
-            
+            self._prefetch_queue.clear()
+
+    @Slot(int, int)
+    def set_cache_budget(self, cache_budget_mb: int, compressed_cache_budget_mb: int):
+        self._cache.set_budget(cache_budget_mb * MB, compressed_cache_budget_mb * MB)
+
+    @Slot(str, int)
+    def set_preview_store(self, store_dir: str, budget_mb: int):
+        """Moves the on-disk preview store to store_dir, or turns it off if store_dir is empty."""
+        if not store_dir:
+            self._store = None
+        elif self._store is not None and os.path.abspath(self._store.root) == os.path.abspath(store_dir):
+            self._store.set_budget(budget_mb * MB)
+        else:
+            self._store = PreviewStore(store_dir, budget_mb * MB)
+
+    @Slot(int)
+    def set_decode_workers(self, count: int):
+        self._pool.setMaxThreadCount(max(1, count))
+
     @Slot()
     def clear_cache(self):
         self._cache.clear()
 
     @Slot(list)
     def clear_specific_paths(self, paths: list):
-        for path in paths:
-            if path in self._cache:
-                del self._cache[path]
+        self._cache.discard(paths)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters and byte usage of the cache tiers."""
+        stats = self._cache.stats()
+        if self._store is not None:
+            stats["disk"] = self._store.stats()
+        return stats
+
+    @Slot()
+    def shutdown(self):
+        """Drops queued work and waits briefly for running decodes."""
+        self._prefetch_queue.clear()
+        for task in self._in_flight.values():
+            task.cancelled = True
+        self._pool.clear()
+        self._pool.waitForDone(2000)
+        self._correct_pool.waitForDone(5000) # Let corrections finish writing their pages
 
     @Slot(str, bool)
-    def load_image(self, path: str, force_reload: bool = False):
-        if not path or not os.path.exists(path):
+    @Slot(str, bool, QSize)
+    @Slot(str, bool, QSize, str)
+    def load_image(self, path: str, force_reload: bool = False, target_size: QSize = None, channel: str = None):
+        if channel is not None:
+            self._release_channel(channel)
+        self._request(path, force_reload, target_size, channel)
+
+    @Slot(str, bool, QSize)
+    @Slot(str, bool, QSize, str)
+    def load_progressive(self, path: str, force_reload: bool = False, target_size: QSize = None, channel: str = None):
+        """
+        Two-stage load: a cheap preview sized for target_size (cache, preview
+        store or reduced decode) through preview_loaded, then the full-resolution
+        image through image_loaded. A cached full-resolution image skips the preview.
+        """
+        if channel is not None:
+            self._release_channel(channel)
+        fingerprint = file_fingerprint(path)
+        if target_size is not None and not target_size.isEmpty() and fingerprint is not None \
+                and (force_reload or not self._caching_enabled or not self._cache.contains((path, FULL), fingerprint)):
+            self._request(path, force_reload, target_size, channel)
+        self._request(path, force_reload, None, channel)
+
+    def _request(self, path, force_reload, target_size, channel):
+        fingerprint = file_fingerprint(path)
+        if not path or fingerprint is None:
             self.image_loaded.emit(path, QPixmap())
             return
-        
-        # Cache Hit
-        if not force_reload and self._caching_enabled and path in self._cache:
-            self._cache.move_to_end(path)
-            self.image_loaded.emit(path, self._cache[path])
+
+        if target_size is not None and target_size.isEmpty():
+            target_size = None
+
+        # Cache Hit (a cached full-resolution image also satisfies a preview request)
+        if not force_reload and self._caching_enabled:
+            pixmap, full_size = self._lookup(path, target_size, fingerprint)
+            if pixmap is not None:
+                self._emit_loaded(path, pixmap, full_size)
+                return
+
+        # Cache Miss - Join a running decode of the same version of the page if it produces enough pixels
+        task = self._in_flight.get(path)
+        if task is None or force_reload or task.fingerprint != fingerprint or not self._task_covers(task, target_size):
+            task = _DecodeTask(self, path, target_size, prefetch=False, fingerprint=fingerprint)
+            self._in_flight[path] = task
+            self._pool.start(task, VISIBLE_PRIORITY)
+        elif task.prefetch and self._pool.tryTake(task):
+            # Still queued behind the rest of the prefetch window: the page is on screen now
+            task.prefetch = False
+            self._prefetch_in_flight -= 1
+            self._pool.start(task, VISIBLE_PRIORITY)
+
+        # Decode on the pool; delivered through _on_decoded
+        task.channels.add(channel)
+        if channel is not None:
+            self._channels.setdefault(channel, []).append(task)
+
+    @Slot(object)
+    def set_lighting_standard(self, metrics):
+        """Uses AppConfig.lighting_standard_metrics (or None) for lighting correction from now on."""
+        self._lighting_template = template_cdfs(metrics)
+
+    @Slot(str, bool, bool)
+    @Slot(str, bool, bool, bool)
+    def auto_process_image(self, path: str, lighting: bool = True, color: bool = True, sharpen: bool = False):
+        """
+        Queues automatic levels / white balance (and optionally sharpening) for a
+        new scan. The correction is estimated on a small proxy and applied in one
+        lookup-table pass, sharpening runs strip by strip; the result is saved
+        over the page and processing_complete follows so viewers can reload it.
+        With a lighting standard set, lighting is histogram-matched to it.
+        """
+        if path and (lighting or color or sharpen):
+            self._correct_pool.start(_CorrectTask(self, path, lighting, color, sharpen, self._lighting_template))
+
+    @Slot(list, QSize)
+    def prefetch(self, paths: list, target_size: QSize = None):
+        """
+        Warms the cache with a window of pages, nearest first, at lower priority
+        than visible loads. A new window replaces the previous one. Prefetching
+        stops once the window no longer fits in the cache budget.
+        """
+        if not self._caching_enabled:
             return
+        # Queued prefetches that dropped out of the window are not worth decoding any more
+        for task in list(self._in_flight.values()):
+            if task.prefetch and not task.channels and task.path not in paths:
+                self._cancel(task)
+        self._prefetch_window = set(paths)
+        self._prefetch_queue = deque(paths)
+        self._prefetch_target = target_size if target_size is not None and not target_size.isEmpty() else None
+        self._dispatch_prefetch()
 
-        # Cache Miss - Load from disk
-        try:
-            # Retry logic for loading files that might be currently writing
-            pil_img = self._safe_open_image(path)
-            
-            if pil_img:
-                if pil_img.mode != "RGBA":
-                    pil_img = pil_img.convert("RGBA")
-                
-                q_image = ImageQt(pil_img)
-                pixmap = QPixmap.fromImage(q_image)
-                
-                if self._caching_enabled:
-                    self._cache[path] = pixmap
-                    if len(self._cache) > self.CACHE_LIMIT:
-                        self._cache.popitem(last=False) # Remove oldest
-                
-                self.image_loaded.emit(path, pixmap)
-            else:
-                self.image_loaded.emit(path, QPixmap())
+    def _dispatch_prefetch(self):
+        # Leave one pool thread free so a visible page never waits for a running prefetch
+        limit = max(1, self._pool.maxThreadCount() - 1)
+        target_size = self._prefetch_target
+        while self._prefetch_queue and self._prefetch_in_flight < limit:
+            path = self._prefetch_queue.popleft()
+            fingerprint = file_fingerprint(path)
+            if not self._caching_enabled or path in self._in_flight or fingerprint is None:
+                continue
+            if self._cache.contains((path, FULL), fingerprint) or \
+                    (target_size is not None and self._cache.contains((path, PREVIEW), fingerprint)):
+                continue
+            task = _DecodeTask(self, path, target_size, prefetch=True, fingerprint=fingerprint)
+            self._in_flight[path] = task
+            self._prefetch_in_flight += 1
+            self._pool.start(task, PREFETCH_PRIORITY)
 
-        except Exception as e:
-            self.error_occurred.emit(f"Failed to load image {os.path.basename(path)}: {e}")
+    def _release_channel(self, channel):
+        """Drops the channel's interest in its previous load; cancels the decode if nobody else waits for it."""
+        for task in self._channels.pop(channel, ()):
+            task.channels.discard(channel)
+            if not task.channels:
+                if task.prefetch and task.path in self._prefetch_window:
+                    continue # Still wanted for the cache
+                self._cancel(task)
+
+    def _cancel(self, task):
+        # A queued task bails out in run(); one that is already decoding still lands in the cache
+        if self._in_flight.get(task.path) is task:
+            del self._in_flight[task.path]
+        task.cancelled = True
+
+    def _finish(self, task):
+        if self._in_flight.get(task.path) is task:
+            del self._in_flight[task.path]
+        if task.prefetch:
+            self._prefetch_in_flight -= 1
 
-    def _safe_open_image(self, path):
-        for i in range(5):
+    @staticmethod
+    def _task_covers(task, target_size):
+        if task.target_size is None:
+            return True
+        return target_size is not None and task.target_size.width() >= target_size.width() \
+            and task.target_size.height() >= target_size.height()
+
+    @Slot(object, object, object, str)
+    def _on_decoded(self, task, q_image, full_size, error):
+        path = task.path
+        self._finish(task)
+        waiting = bool(task.channels)
+
+        if task.cancelled and q_image is None:
+            pass # Superseded before it was decoded
+        elif error:
+            # Prefetch is best-effort; a visible load of the same page will report the error
+            if waiting:
+                self.error_occurred.emit(f"Failed to load image {os.path.basename(path)}: {error}")
+        else:
+            pixmap = QPixmap.fromImage(q_image) if q_image is not None else QPixmap()
+            stored = False
+            if self._caching_enabled and not pixmap.isNull():
+                pinned = self._prefetch_window if task.prefetch else None
+                if full_size is not None:
+                    stored = self._cache.put((path, PREVIEW), (pixmap, full_size), _pixmap_nbytes(pixmap), pinned, task.fingerprint)
+                else:
+                    stored = self._cache.put((path, FULL), pixmap, _pixmap_nbytes(pixmap), pinned, task.fingerprint)
+
+            if waiting:
+                self._emit_loaded(path, pixmap, full_size)
+            elif task.prefetch and not stored and not pixmap.isNull():
+                # Budget reached: the rest of the window would evict pages we just warmed
+                self._prefetch_queue.clear()
+
+        self._dispatch_prefetch()
+
+    def _emit_loaded(self, path, pixmap, full_size):
+        if full_size is None:
+            self.image_loaded.emit(path, pixmap)
+        else:
+            self.preview_loaded.emit(path, pixmap, full_size)
+
+    def _lookup(self, path, target_size, fingerprint):
+        """Returns (pixmap, full_size) from the cache; full_size is None for full-resolution entries."""
+        keys = [(path, FULL)] if target_size is None else [(path, FULL), (path, PREVIEW)]
+        key, cached = self._cache.get_first(keys, fingerprint)
+        if key == (path, FULL):
+            return cached, None
+        if cached is not None and self._covers(cached[0].width(), cached[1], target_size):
+            return cached
+        return None, None
+
+    @staticmethod
+    def _covers(width, full_size, target_size):
+        """True if a reduced image `width` pixels wide has enough pixels to fill target_size at fit zoom."""
+        fit = min(target_size.width() / full_size.width(), target_size.height() / full_size.height(), 1.0)
+        return width >= int(full_size.width() * fit)
+
+    # --- Pool side (runs on decode threads) ---
+
+    def _decode_image(self, path, target_size):
+        """
+        Decodes the file into a QImage (safe off the GUI thread).
+        Returns (q_image, full_size); full_size is None when the image is full
+        resolution, q_image is None if the file could not be read.
+        """
+        store = self._store # may be swapped by set_preview_store() meanwhile
+        stored = store.get(path) if store is not None and target_size is not None else None
+        if stored is not None and self._covers(stored[0].width, stored[1], target_size):
+            pil_img, full_size = stored
+        # Retry logic for loading files that might be currently writing
+        elif target_size is not None:
+            pil_img, full_size = self._safe_open_image(path, target_size)
+            if pil_img and store is not None and (pil_img.width, pil_img.height) != (full_size.width(), full_size.height()):
+                store.put(path, pil_img, full_size)
+        else:
+            pil_img, full_size = self._safe_open_image(path), None
+
+        if not pil_img:
+            return None, None
+
+        # Reduced decode only if it actually came out smaller than the source
+        if full_size is not None and QSize(pil_img.width, pil_img.height) == full_size:
+            full_size = None
+
+        return pil_to_qimage(pil_img), full_size
+
+    def _safe_open_image(self, path, target_size=None):
+        # A file the scanner is still writing is waited for (close-write event or
+        # complete format trailer) rather than retried on a fixed sleep. Files that
+        # never pass the check (e.g. data after a PNG's IEND) still get one decode.
+        for attempt in range(2):
+            ready = file_readiness.wait_until_ready(path, READY_TIMEOUT)
             try:
-                with Image.open(path) as img:
-                    img.load()
-                    return img.copy()
+                # Uncompressed BMP/TIFF rasters are read through a memory map
+                # instead of being pulled into the warm tier and copied
+                raster = MappedRaster.open(path)
+                if raster is not None:
+                    with raster:
+                        return raster.image() if target_size is None else raster.reduced(target_size)
+                with Image.open(io.BytesIO(self._read_source(path))) as img:
+                    if target_size is None:
+                        img.load()
+                        return img.copy()
+                    return self._decode_reduced(img, target_size)
             except (IOError, OSError):
-                time.sleep(0.1)
-        return None
\ No newline at end of file
+                # Don't trust the close event or the cached bytes a second time
+                file_readiness.forget(path)
+                self._cache.discard([path])
+                if not ready:
+                    break # already waited the full timeout
+        return None if target_size is None else (None, None)
+
+    def _read_source(self, path):
+        """Returns the compressed file bytes, from the warm cache tier when possible."""
+        fingerprint = file_fingerprint(path)
+        data = self._cache.get_bytes(path, fingerprint) if self._caching_enabled else None
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if self._caching_enabled:
+                self._cache.put_bytes(path, data, fingerprint)
+        return data
+
+    @staticmethod
+    def _decode_reduced(img, target_size):
+        """
+        Decodes just enough of the image to cover target_size.
+        JPEGs are scaled inside the decoder (1/2, 1/4, 1/8), everything else
+        is box-reduced by an integer factor after loading.
+        Returns (pil_image, full_size).
+        """
+        full_size = QSize(img.width, img.height)
+        fit = min(target_size.width() / img.width, target_size.height() / img.height, 1.0)
+        tw, th = max(1, math.ceil(img.width * fit)), max(1, math.ceil(img.height * fit))
+
+        # draft() picks the smallest DCT scale that is still >= the requested size
+        img.draft(img.mode, (tw, th))
+        img.load()
+
+        factor = min(img.width // tw, img.height // th)
+        if factor >= 2:
+            return img.reduce(factor), full_size
+        return img.copy(), full_size
\ No newline at end of file
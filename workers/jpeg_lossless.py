@@ -0,0 +1,94 @@
+import os
+import shutil
+import subprocess
+from PIL import JpegImagePlugin
+
+from digipage.workers.file_readiness import replace_file, temp_path_for
+from digipage.workers.image_cache import file_fingerprint
+
+# libjpeg(-turbo)'s jpegtran does the DCT-domain work; without it every edit is re-encoded
+JPEGTRAN = shutil.which("jpegtran")
+JPEGTRAN_TIMEOUT = 60
+
+# JpegImagePlugin.get_sampling() -> iMCU size in pixels (4:4:4, 4:2:2, 4:2:0)
+_MCU_SIZES = {0: (8, 8), 1: (16, 8), 2: (16, 16)}
+
+def mcu_size(img):
+    """Size of the JPEG's iMCU, the granularity of lossless crop offsets."""
+    if img.mode == "L":
+        return 8, 8
+    return _MCU_SIZES.get(JpegImagePlugin.get_sampling(img), (16, 16))
+
+def snap_crop_box(img, box):
+    """
+    Moves the top-left corner of (left, top, right, bottom) out to the iMCU
+    grid, which is where a lossless crop has to start; the right and bottom
+    edges can stay where they are. The result is clamped to the image.
+    """
+    mcu_w, mcu_h = mcu_size(img)
+    left, top = max(0, box[0]), max(0, box[1])
+    right, bottom = min(img.width, box[2]), min(img.height, box[3])
+    return left - left % mcu_w, top - top % mcu_h, right, bottom
+
+def lossless_crop(path, box) -> bool:
+    """Crops a JPEG in place without re-encoding; box must already be snap_crop_box()'ed."""
+    left, top, right, bottom = box
+    return _jpegtran(path, ["-crop", f"{right - left}x{bottom - top}+{left}+{top}"])
+
+def lossless_rotate(path, degrees) -> bool:
+    """
+    Turns a JPEG clockwise by 90, 180 or 270 degrees without re-encoding.
+    Fails (-perfect) when partial edge blocks would have to be dropped.
+    """
+    return _jpegtran(path, ["-rotate", str(int(degrees) % 360)])
+
+def save_like(img, source, path, fingerprint=None) -> bool:
+    """
+    Saves an edited image over path atomically (source may already be closed;
+    only its format and encoder settings are read). JPEG sources keep their
+    quantization tables, chroma subsampling, EXIF, ICC profile and DPI, so a
+    re-encode that cannot be avoided does not also degrade quality.
+    With a file_fingerprint(), the page is only replaced if it still has it once
+    the encode is done; returns False (writing nothing) if it was changed meanwhile.
+    """
+    options = {}
+    if source.format == "JPEG":
+        options = {"qtables": source.quantization, "exif": source.info.get("exif", b"")}
+        sampling = JpegImagePlugin.get_sampling(source)
+        if sampling != -1:
+            options["subsampling"] = sampling
+    for key in ("icc_profile", "dpi"):
+        if key in source.info:
+            options[key] = source.info[key]
+
+    tmp_path = temp_path_for(path)
+    try:
+        img.save(tmp_path, format=source.format, **options)
+        if fingerprint is not None and file_fingerprint(path) != fingerprint:
+            os.remove(tmp_path)
+            return False
+        replace_file(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+def _jpegtran(path, args) -> bool:
+    if JPEGTRAN is None:
+        return False
+    try:
+        tmp_path = temp_path_for(path)
+    except OSError:
+        return False
+    try:
+        subprocess.run(
+            [JPEGTRAN, "-copy", "all", "-perfect", *args, "-outfile", tmp_path, path],
+            check=True, capture_output=True, timeout=JPEGTRAN_TIMEOUT
+        )
+        replace_file(tmp_path, path)
+        return True
+    except (OSError, subprocess.SubprocessError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
@@ -0,0 +1,80 @@
+import numpy as np
+from PIL import Image
+from PySide6.QtCore import QObject, Signal, Slot, QSize
+
+from digipage.workers.auto_correct import PROXY_SIZE, template_metrics
+from digipage.workers.mapped_raster import MappedRaster
+
+class LightingStandardWorker(QObject):
+    """
+    Computes the lighting standard from a folder of reference scans off the GUI
+    thread: the CDFs (template_metrics) of the mean reference page.
+
+    Every reference is decoded only as far as needed for a PROXY_SIZE proxy (JPEG
+    draft scaling, banded reduce of mapped BMP/TIFF rasters), resized to the first
+    one's proxy size and added to a running float64 sum. Only one proxy and the
+    sum are alive at any time, so memory does not grow with the number of
+    references. Unreadable files are skipped.
+    """
+    progress = Signal(int, int) # processed, total
+    finished = Signal(object, int) # metrics (None if cancelled or nothing usable), images used
+    error_occurred = Signal(str)
+
+    def __init__(self, paths: list):
+        super().__init__()
+        self.paths = list(paths)
+        self._cancel_flag = False
+
+    @Slot()
+    def cancel_operation(self):
+        # Called directly from the GUI thread while run() is busy
+        self._cancel_flag = True
+
+    @Slot()
+    def run(self):
+        self._cancel_flag = False
+        total, used, size = None, 0, None
+        for index, path in enumerate(self.paths):
+            if self._cancel_flag:
+                self.finished.emit(None, used)
+                return
+            try:
+                proxy = self._load_proxy(path, size)
+            except (IOError, OSError, ValueError):
+                proxy = None
+            if proxy is not None:
+                size = proxy.size
+                pixels = np.asarray(proxy, dtype=np.float64)
+                if total is None:
+                    total = pixels
+                else:
+                    total += pixels
+                used += 1
+            self.progress.emit(index + 1, len(self.paths))
+
+        if not used:
+            self.error_occurred.emit("None of the reference images could be read.")
+            self.finished.emit(None, 0)
+            return
+        mean = (total / used).astype(np.float32)
+        self.finished.emit(template_metrics(mean), used)
+
+    @staticmethod
+    def _load_proxy(path, size):
+        """RGB proxy of the page: long edge at most PROXY_SIZE, or exactly `size` once the first reference set it."""
+        request = size or (PROXY_SIZE, PROXY_SIZE)
+        raster = MappedRaster.open(path)
+        if raster is not None:
+            with raster:
+                img, _ = raster.reduced(QSize(*request))
+        else:
+            with Image.open(path) as source:
+                source.draft("RGB", request) # JPEG: decode at 1/2 .. 1/8 scale
+                img = source.convert("RGB")
+        img = img.convert("RGB")
+        if size is None:
+            scale = min(1.0, PROXY_SIZE / max(img.size))
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        if img.size != size:
+            img = img.resize(size, Image.Resampling.BOX if img.width >= size[0] else Image.Resampling.BILINEAR)
+        return img
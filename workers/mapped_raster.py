@@ -0,0 +1,199 @@
+import math
+import mmap
+import os
+import struct
+from PIL import Image
+from PySide6.QtCore import QSize
+
+# Output rows produced per step when building a reduced copy
+BAND_ROWS = 64
+
+# TIFF tags read from the first IFD
+_TIFF_TAGS = {
+    256: "width", 257: "height", 258: "bits", 259: "compression", 262: "photometric",
+    273: "offsets", 274: "orientation", 277: "samples", 279: "counts", 284: "planar",
+}
+_TIFF_TYPES = {3: ("H", 2), 4: ("I", 4)}  # SHORT, LONG
+
+class MappedRaster:
+    """
+    Read-only memory map over the pixel rows of an uncompressed BMP or TIFF scan.
+
+    Nothing is read up front: the OS pages rows in as they are touched, and those
+    pages belong to the file cache rather than to the process. reduced() walks
+    the rows in bands and keeps only the downscaled result, so a preview of a
+    300 MB raster needs a few MB of private memory; image() makes the single
+    copy a full-resolution view needs.
+
+    open() returns None for anything it cannot address in place (compressed or
+    palette images, planar or multi-strip-with-gaps TIFFs, other bit depths);
+    callers then go through Image.open() as before.
+    """
+
+    def __init__(self, mm, offset, size, stride, mode, rawmode, bottom_up):
+        self._mm = mm
+        self._offset = offset
+        self.width, self.height = size
+        self._stride = stride
+        self.mode = mode
+        self._rawmode = rawmode
+        self._bottom_up = bottom_up
+
+    @classmethod
+    def open(cls, path: str):
+        try:
+            with open(path, "rb") as f:
+                head = f.read(16)
+                if head.startswith(b"BM"):
+                    layout = _bmp_layout(f)
+                elif head[:4] in (b"II*\x00", b"MM\x00*"):
+                    layout = _tiff_layout(f, "<" if head[:2] == b"II" else ">")
+                else:
+                    return None
+                if layout is None:
+                    return None
+                offset, size, stride = layout[0], layout[1], layout[2]
+                if offset + stride * size[1] > os.fstat(f.fileno()).st_size:
+                    return None  # Truncated; let the regular path report it
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            return None
+        return cls(mm, *layout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def image(self):
+        """The whole raster as a Pillow image (one copy, converted from the file's channel order)."""
+        return self._rows(0, self.height)
+
+    def reduced(self, target_size: QSize):
+        """
+        Box-reduces the raster by the largest integer factor that still covers
+        target_size, one band of rows at a time. Returns (pil_image, full_size)
+        like ImageWorker._decode_reduced.
+        """
+        full_size = QSize(self.width, self.height)
+        fit = min(target_size.width() / self.width, target_size.height() / self.height, 1.0)
+        tw, th = max(1, math.ceil(self.width * fit)), max(1, math.ceil(self.height * fit))
+        factor = min(self.width // tw, self.height // th)
+        if factor < 2:
+            return self.image(), full_size
+
+        out = Image.new(self.mode, (math.ceil(self.width / factor), math.ceil(self.height / factor)))
+        band = BAND_ROWS * factor
+        for y in range(0, self.height, band):
+            rows = self._rows(y, min(y + band, self.height))
+            out.paste(rows.reduce(factor), (0, y // factor))
+            self._release(y, min(y + band, self.height))
+        return out, full_size
+
+    def sampled(self, factor: int):
+        """
+        Point-samples every factor-th row and column: touches only the sampled
+        rows, for analyses that average over many pixels anyway.
+        """
+        factor = max(1, factor)
+        size = (max(1, self.width // factor), max(1, self.height // factor))
+        out = Image.new(self.mode, size)
+        for y in range(size[1]):
+            row = self._rows(y * factor, y * factor + 1)
+            out.paste(row.resize((size[0], 1), Image.Resampling.NEAREST), (0, y))
+        return out
+
+    def _rows(self, top, bottom):
+        """Copies image rows [top, bottom) out of the map."""
+        count = bottom - top
+        # Bottom-up BMPs store the last image row first
+        first = self.height - bottom if self._bottom_up else top
+        start = self._offset + first * self._stride
+        with memoryview(self._mm) as view:
+            return Image.frombytes(
+                self.mode, (self.width, count), view[start:start + count * self._stride],
+                "raw", self._rawmode, self._stride, -1 if self._bottom_up else 1
+            )
+
+    def _release(self, top, bottom):
+        """Drops the mapped pages of rows [top, bottom) from the process (they stay in the file cache)."""
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        first = self.height - bottom if self._bottom_up else top
+        start = self._offset + first * self._stride
+        aligned = start - start % mmap.PAGESIZE
+        self._mm.madvise(mmap.MADV_DONTNEED, aligned, start + (bottom - top) * self._stride - aligned)
+
+def _bmp_layout(f):
+    """(offset, size, stride, mode, rawmode, bottom_up) of an uncompressed BMP, or None."""
+    f.seek(10)
+    offset, header_size = struct.unpack("<II", f.read(8))
+    if header_size < 40:
+        return None  # OS/2 core headers
+    width, height, _, bits, compression, _, _, _, colors = struct.unpack("<iiHHIIiiI", f.read(32))
+    if compression != 0 or width <= 0 or height == 0:
+        return None
+    if bits == 24:
+        mode, rawmode = "RGB", "BGR"
+    elif bits == 32:
+        mode, rawmode = "RGB", "BGRX"
+    elif bits == 8:
+        # Only an identity grey palette can be shown without a lookup
+        colors = colors or 256
+        f.seek(14 + header_size)
+        palette = f.read(colors * 4)
+        if colors != 256 or palette != b"".join(bytes((i, i, i, 0)) for i in range(256)):
+            return None
+        mode, rawmode = "L", "L"
+    else:
+        return None
+    stride = (width * bits + 31) // 32 * 4
+    return offset, (width, abs(height)), stride, mode, rawmode, height > 0
+
+def _tiff_layout(f, order):
+    """(offset, size, stride, mode, rawmode, bottom_up) of a contiguous uncompressed 8-bit TIFF, or None."""
+    f.seek(4)
+    ifd = struct.unpack(order + "I", f.read(4))[0]
+    f.seek(ifd)
+    count = struct.unpack(order + "H", f.read(2))[0]
+    entries = f.read(count * 12)
+
+    tags = {}
+    for i in range(count):
+        tag, typ, n, raw = struct.unpack(order + "HHI4s", entries[i * 12:(i + 1) * 12])
+        if tag not in _TIFF_TAGS or typ not in _TIFF_TYPES:
+            continue
+        code, item = _TIFF_TYPES[typ]
+        if n * item <= 4:
+            data = raw[:n * item]
+        else:
+            f.seek(struct.unpack(order + "I", raw)[0])
+            data = f.read(n * item)
+        tags[_TIFF_TAGS[tag]] = struct.unpack(order + code * n, data)
+
+    samples = tags.get("samples", (1,))[0]
+    photometric = tags.get("photometric", (None,))[0]
+    if tags.get("compression", (1,))[0] != 1 or tags.get("planar", (1,))[0] != 1 \
+            or tags.get("orientation", (1,))[0] != 1 or set(tags.get("bits", (8,))) != {8}:
+        return None
+    if (photometric, samples) == (1, 1):
+        mode = "L"
+    elif (photometric, samples) == (2, 3):
+        mode = "RGB"
+    else:
+        return None
+    if "width" not in tags or "height" not in tags or not tags.get("offsets"):
+        return None
+
+    # Strips must follow each other without gaps to be addressed as one block
+    offsets, counts = tags["offsets"], tags.get("counts", ())
+    if len(offsets) != len(counts) or any(o + c != nxt for o, c, nxt in zip(offsets, counts, offsets[1:])):
+        return None
+    width, height = tags["width"][0], tags["height"][0]
+    return offsets[0], (width, height), width * samples, mode, mode, False
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+from PySide6.QtCore import QSize
+
+class PreviewStore:
+    """
+    Persistent on-disk cache of screen-resolution previews, shared between sessions.
+
+    Entries are keyed by a (path, size, mtime_ns) fingerprint of the source file,
+    so an edited or replaced scan never serves a stale preview; outdated entries
+    simply age out. The full image size is kept in the file name because the
+    viewer needs it to lay out a preview at the right scale.
+
+    The directory is bounded by bytes and evicted least recently used first
+    (file mtimes carry the LRU order across restarts). All methods are thread-safe.
+    """
+
+    def __init__(self, root: str, budget_bytes: int):
+        self.root = root
+        self._budget = max(0, int(budget_bytes))
+        self._lock = threading.Lock()
+        self._index = None  # digest -> (file name, nbytes), oldest first
+        self._bytes = 0
+
+    @staticmethod
+    def fingerprint(path: str):
+        """(path, size, mtime_ns) of the source file, or None if it cannot be stat'ed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def get(self, path: str):
+        """Returns (pil_image, full_size) for the file's current contents, or None."""
+        fp = self.fingerprint(path)
+        if fp is None:
+            return None
+        digest = self._digest(fp)
+        with self._lock:
+            entry = self._load_index().get(digest)
+            if entry is None:
+                return None
+            self._index.move_to_end(digest)
+        name = entry[0]
+        file_path = os.path.join(self.root, name)
+        try:
+            with Image.open(file_path) as img:
+                img.load()
+                preview = img.copy()
+            os.utime(file_path)
+        except (IOError, OSError):
+            self._drop(digest)
+            return None
+        w, h = name.rsplit(".", 1)[0].split("_")[1].split("x")
+        return preview, QSize(int(w), int(h))
+
+    def put(self, path: str, pil_img, full_size: QSize):
+        """Stores a reduced decode of path; replaces any smaller preview of the same file."""
+        fp = self.fingerprint(path)
+        if fp is None or self._budget == 0:
+            return
+        digest = self._digest(fp)
+        ext = "jpg" if pil_img.mode in ("RGB", "L") else "png"
+        name = f"{digest}_{full_size.width()}x{full_size.height()}.{ext}"
+        file_path = os.path.join(self.root, name)
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            if ext == "jpg":
+                pil_img.save(tmp_path, "JPEG", quality=90)
+            else:
+                pil_img.save(tmp_path, "PNG", compress_level=1)
+            nbytes = os.path.getsize(tmp_path)
+            os.replace(tmp_path, file_path)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            index = self._load_index()
+            old = index.pop(digest, None)
+            if old is not None:
+                self._bytes -= old[1]
+                if old[0] != name:
+                    self._remove_file(old[0])
+            index[digest] = (name, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def set_budget(self, budget_bytes: int):
+        with self._lock:
+            self._budget = max(0, int(budget_bytes))
+            self._load_index()
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+            return {"entries": len(index), "bytes": self._bytes, "budget": self._budget}
+
+    @staticmethod
+    def _digest(fp) -> str:
+        return hashlib.sha1("\0".join(map(str, fp)).encode("utf-8")).hexdigest()
+
+    def _load_index(self):
+        """Builds the in-memory index from the directory on first use (caller holds the lock)."""
+        if self._index is not None:
+            return self._index
+        entries = []
+        try:
+            with os.scandir(self.root) as it:
+                for e in it:
+                    if e.name.endswith(".tmp"):
+                        self._remove_file(e.name) # Left over from an interrupted write
+                    elif e.is_file() and "_" in e.name:
+                        st = e.stat()
+                        entries.append((st.st_mtime_ns, e.name, st.st_size))
+        except OSError:
+            pass
+        entries.sort()
+        self._index = OrderedDict((name.split("_", 1)[0], (name, size)) for _, name, size in entries)
+        self._bytes = sum(size for _, size in self._index.values())
+        self._evict()
+        return self._index
+
+    def _evict(self):
+        while self._bytes > self._budget and self._index:
+            _, (name, nbytes) = self._index.popitem(last=False)
+            self._bytes -= nbytes
+            self._remove_file(name)
+
+    def _drop(self, digest):
+        with self._lock:
+            entry = self._index.pop(digest, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+                self._remove_file(entry[0])
+
+    def _remove_file(self, name):
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
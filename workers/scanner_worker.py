@@ -1,17 +1,42 @@
 import os
 import shutil
-import math
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import numpy as np
 from PIL import Image, ImageOps
 
-from PySide6.QtCore import QObject, Signal, Slot, QRect
+from PySide6.QtCore import QObject, Signal, Slot, QRect, QRunnable, QThreadPool
 
-from digipage.core.config import AppConfig, BACKUP_DIR, ALLOWED_EXTENSIONS
+from digipage.core.config import AppConfig, ALLOWED_EXTENSIONS
 from digipage.data.io import LogManager, count_pages_in_folder
 from digipage.utils.string_utils import natural_sort_key
+from digipage.utils.geometry import rotate_crop_matrix
+from digipage.workers.backup_store import shared_backup_store
+from digipage.workers.deskew import MIN_SKEW, estimate_skew_file
+from digipage.workers.jpeg_lossless import snap_crop_box, lossless_crop, lossless_rotate, save_like
+from digipage.workers.page_layout import detect_split_layout, layout_proxy
+
+class _SplitTask(QRunnable):
+    """Splits one single-shot scan on the split pool instead of the worker thread."""
+    def __init__(self, worker, source_path, layout):
+        super().__init__()
+        self.worker = worker
+        self.source_path = source_path
+        self.layout = layout
+
+    def run(self):
+        # A newer layout for the same scan was queued meanwhile: only that one is written
+        if self.worker._split_pending.get(self.source_path) is not self:
+            return
+        try:
+            self.worker._split(self.source_path, self.layout)
+        except Exception as e:
+            self.worker.error_occurred.emit(f"Split failed: {e}")
+        finally:
+            if self.worker._split_pending.get(self.source_path) is self:
+                del self.worker._split_pending[self.source_path]
 
 class ScannerWorker(QObject):
     """
@@ -27,12 +52,24 @@ class ScannerWorker(QObject):
     book_progress = Signal(int, int)
     transfer_ready = Signal(list, list) # moves, warnings
     error_occurred = Signal(str)
+    layout_detected = Signal(str, dict, float) # path, proposed split layout, confidence
+    skew_detected = Signal(str, float, float) # path, proposed rotation, confidence
+    deskew_finished = Signal(str) # path; after every auto_deskew(), whether it rotated the page or not
 
     def __init__(self, config: AppConfig):
         super().__init__()
         self.config = config
         self._cancel_flag = False
 
+        # Page splits: one at a time and in order (so a later layout always wins),
+        # each with its two halves encoded concurrently
+        self._split_pool = QThreadPool(self)
+        self._split_pool.setMaxThreadCount(1)
+        self._encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="split-encode")
+        self._split_pending = {}  # source path -> latest _SplitTask
+
+        self._backups = shared_backup_store()
+
     @Slot()
     def cancel_current_op(self):
         self._cancel_flag = True
@@ -84,21 +121,34 @@ class ScannerWorker(QObject):
     # --- 2. Image Manipulation ---
 
     def _backup_image(self, path):
-        if not os.path.exists(BACKUP_DIR): os.makedirs(BACKUP_DIR)
-        dest = os.path.join(BACKUP_DIR, os.path.basename(path))
-        if not os.path.exists(dest):
-            try:
-                shutil.copy2(path, dest)
-            except Exception:
-                pass # Non-critical
+        try:
+            self._backups.backup(path)
+        except Exception:
+            pass # Non-critical
+
+    @Slot(str)
+    def restore_image(self, path):
+        try:
+            if self._backups.restore(path):
+                self.operation_complete.emit("restore", path)
+            else:
+                self.error_occurred.emit(f"No backup found for {os.path.basename(path)}")
+        except Exception as e:
+            self.error_occurred.emit(f"Restore failed: {e}")
 
     @Slot(str, QRect)
     def crop_image(self, path, rect):
         try:
             self._backup_image(path)
+            box = (rect.x(), rect.y(), rect.x()+rect.width(), rect.y()+rect.height())
             with Image.open(path) as img:
-                cropped = img.crop((rect.x(), rect.y(), rect.x()+rect.width(), rect.y()+rect.height()))
-                cropped.save(path)
+                # JPEGs are cropped in the DCT domain; the top-left corner moves out
+                # to the block grid (at most 15 px), harmless for a page margin
+                snapped = snap_crop_box(img, box) if img.format == "JPEG" else None
+            if snapped is None or not lossless_crop(path, snapped):
+                with Image.open(path) as img:
+                    cropped = img.crop(box)
+                save_like(cropped, img, path)
             self.operation_complete.emit("crop", path)
         except Exception as e:
             self.error_occurred.emit(f"Crop failed: {e}")
@@ -107,74 +157,108 @@ class ScannerWorker(QObject):
     def rotate_and_crop(self, path, angle):
         try:
             self._backup_image(path)
+            if angle % 90 == 0:
+                self._rotate_quarter_turns(path, angle)
+                self.operation_complete.emit("rotate", path)
+                return
             with Image.open(path) as img:
-                # Calculate zoom needed to eliminate black borders after rotation
-                w, h = img.size
-                rads = math.radians(angle)
-                # Calculate bounding box of rotated image to know how much to zoom
-                # Simplified logic: zoom to fit original bounds
-                cos_a, sin_a = abs(math.cos(rads)), abs(math.sin(rads))
-                # Zoom factor ensures the rotated image covers the original frame
-                zoom = max(
-                    cos_a + (h/w)*sin_a if w > 0 else 1,
-                    (w/h)*sin_a + cos_a if h > 0 else 1
-                )
-
-                rotated = img.rotate(-angle, resample=Image.BICUBIC, expand=True)
-                
-                # Scale up
-                new_w = int(rotated.width * zoom)
-                new_h = int(rotated.height * zoom)
-                scaled = rotated.resize((new_w, new_h), Image.Resampling.LANCZOS)
-                
-                # Center Crop to original size
-                left = (new_w - w) / 2
-                top = (new_h - h) / 2
-                final = scaled.crop((left, top, left + w, top + h))
-                final.save(path)
-                
+                # Rotation, the zoom that hides the empty corners (same as the viewer
+                # preview) and the center crop folded into one resample at output size
+                matrix = rotate_crop_matrix(img.width, img.height, angle)
+                final = img.transform(img.size, Image.AFFINE, matrix, resample=Image.BICUBIC)
+            save_like(final, img, path)
             self.operation_complete.emit("rotate", path)
         except Exception as e:
             self.error_occurred.emit(f"Rotate failed: {e}")
 
+    @Slot(str)
+    def auto_deskew(self, path):
+        """
+        Estimates the text skew of a new scan on a small proxy. Confident
+        estimates are corrected right away through rotate_and_crop; others are
+        proposed through skew_detected so the rotate handle can start there.
+        deskew_finished follows in every case, once the page is final.
+        """
+        try:
+            angle, confidence = estimate_skew_file(path)
+        except Exception as e:
+            self.error_occurred.emit(f"Skew estimation failed: {e}")
+            self.deskew_finished.emit(path)
+            return
+        if abs(angle) >= MIN_SKEW:
+            if confidence >= self.config.auto_deskew_min_confidence:
+                self.rotate_and_crop(path, angle)
+            else:
+                self.skew_detected.emit(path, angle, confidence)
+        self.deskew_finished.emit(path)
+
+    def _rotate_quarter_turns(self, path, angle):
+        """Turns the page clockwise by a multiple of 90 degrees; losslessly for JPEGs when jpegtran can."""
+        degrees = int(angle) % 360
+        if degrees == 0:
+            return
+        with Image.open(path) as img:
+            is_jpeg = img.format == "JPEG"
+        if is_jpeg and lossless_rotate(path, degrees):
+            return
+        transpose = {90: Image.Transpose.ROTATE_270, 180: Image.Transpose.ROTATE_180, 270: Image.Transpose.ROTATE_90}
+        with Image.open(path) as img:
+            turned = img.transpose(transpose[degrees])
+        save_like(turned, img, path)
+
+    @Slot(str)
     @Slot(str, dict)
-    def split_page(self, source_path, layout):
+    def split_page(self, source_path, layout=None):
         """
         Single-Shot Mode: Splits one wide image into two files in /final/ subdir.
-        Layout dict contains relative ratios for left and right pages.
+        Layout dict contains relative ratios for left and right pages; without one
+        the pages and gutter are detected on the decoded scan and the proposal is
+        reported through layout_detected. The scan is only split on a detected
+        layout at auto_split_min_confidence or above; otherwise it is left for
+        the operator to confirm.
+        Runs on the split pool; operation_complete("page_split") reports the result.
         """
-        try:
-            scan_dir = os.path.dirname(source_path)
-            final_dir = os.path.join(scan_dir, 'final')
-            os.makedirs(final_dir, exist_ok=True)
-            
-            base_name = os.path.basename(source_path)
-            name, ext = os.path.splitext(base_name)
+        task = _SplitTask(self, source_path, dict(layout or {}))
+        self._split_pending[source_path] = task
+        self._split_pool.start(task)
 
-            with Image.open(source_path) as img:
-                w, h = img.size
-                
-                # Helper to convert ratio dict to pixel tuple
-                def to_px(r):
-                    return (int(r['x']*w), int(r['y']*h), int((r['x']+r['w'])*w), int((r['y']+r['h'])*h))
-
-                # Process Left
-                left_path = os.path.join(final_dir, f"{name}_L{ext}")
-                if layout.get('left_enabled', True):
-                    img.crop(to_px(layout['left'])).save(left_path)
-                elif os.path.exists(left_path):
-                    os.remove(left_path)
-
-                # Process Right
-                right_path = os.path.join(final_dir, f"{name}_R{ext}")
-                if layout.get('right_enabled', True):
-                    img.crop(to_px(layout['right'])).save(right_path)
-                elif os.path.exists(right_path):
-                    os.remove(right_path)
-
-            self.operation_complete.emit("page_split", source_path)
-        except Exception as e:
-            self.error_occurred.emit(f"Split failed: {e}")
+    def _split(self, source_path, layout):
+        """Decodes the scan once, then encodes both halves concurrently, each written atomically."""
+        scan_dir = os.path.dirname(source_path)
+        final_dir = os.path.join(scan_dir, 'final')
+        os.makedirs(final_dir, exist_ok=True)
+
+        base_name = os.path.basename(source_path)
+        name, ext = os.path.splitext(base_name)
+
+        with Image.open(source_path) as img:
+            img.load()
+        w, h = img.size
+
+        if not layout:
+            layout, confidence = detect_split_layout(layout_proxy(img))
+            self.layout_detected.emit(source_path, layout, confidence)
+            if confidence < self.config.auto_split_min_confidence:
+                return
+
+        # Helper to convert ratio dict to pixel tuple
+        def to_px(r):
+            return (int(r['x']*w), int(r['y']*h), int((r['x']+r['w'])*w), int((r['y']+r['h'])*h))
+
+        halves = []
+        for side, suffix in (('left', 'L'), ('right', 'R')):
+            out_path = os.path.join(final_dir, f"{name}_{suffix}{ext}")
+            if layout.get(f'{side}_enabled', True):
+                halves.append((img.crop(to_px(layout[side])), out_path))
+            elif os.path.exists(out_path):
+                os.remove(out_path)
+
+        # Pillow releases the GIL while encoding, so the halves really run in parallel
+        encodes = [self._encode_pool.submit(save_like, half, img, out_path) for half, out_path in halves]
+        for encode in encodes:
+            encode.result()
+
+        self.operation_complete.emit("page_split", source_path)
 
     # --- 3. File Management ---
 
@@ -183,6 +267,7 @@ class ScannerWorker(QObject):
         try:
             if os.path.exists(path):
                 os.remove(path)
+            self._backups.release(path)
             self.operation_complete.emit("delete", path)
         except OSError as e:
             self.error_occurred.emit(f"Could not delete {os.path.basename(path)}: {e}")
@@ -209,6 +294,7 @@ class ScannerWorker(QObject):
                     ext = os.path.splitext(fpath)[1]
                     new_name = f"{i+1:04d}{ext}"
                     shutil.move(fpath, os.path.join(target_dir, new_name))
+                    self._backups.move(fpath, os.path.join(target_dir, new_name))
                 
                 self.book_progress.emit(i+1, total)
 
@@ -287,6 +373,8 @@ class ScannerWorker(QObject):
                 
                 os.makedirs(move["dest_parent"], exist_ok=True)
                 shutil.move(move["src"], move["dest"])
+                # The book is archived: its originals are no longer needed
+                self._backups.release_tree(move["src"])
                 
                 # Log success
                 page_count = count_pages_in_folder(move["dest"])
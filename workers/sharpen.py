@@ -0,0 +1,82 @@
+import math
+import numpy as np
+from PIL import Image
+
+# Gentle unsharp mask for scanned text: Gaussian sigma (px), strength, and the
+# smallest difference from the blurred image that gets boosted (keeps paper grain flat)
+SHARPEN_SIGMA = 1.0
+SHARPEN_AMOUNT = 0.6
+SHARPEN_THRESHOLD = 4
+
+# Output rows per strip; each strip also reads kernel-radius rows above and below
+STRIP_ROWS = 64
+
+def gaussian_kernel(sigma: float) -> np.ndarray:
+    """Normalised 1-D Gaussian covering +-3 sigma."""
+    radius = max(1, math.ceil(3 * sigma))
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-(x * x) / (2 * sigma * sigma))
+    return kernel / kernel.sum()
+
+def _convolve(src, kernel, axis):
+    """
+    Same-size convolution of a 2-D/3-D strip along axis 0 (rows) or 1 (columns)
+    with a symmetric kernel; src must already be padded by the kernel radius on
+    that axis. Taps are paired so each costs one add and one multiply-add.
+    """
+    radius = len(kernel) // 2
+    n = src.shape[axis] - 2 * radius
+
+    def tap(offset):
+        index = [slice(None)] * src.ndim
+        index[axis] = slice(radius + offset, radius + offset + n)
+        return src[tuple(index)]
+
+    out = tap(0) * kernel[radius]
+    pair = np.empty_like(out)
+    for k in range(1, radius + 1):
+        np.add(tap(-k), tap(k), out=pair)
+        pair *= kernel[radius + k]
+        out += pair
+    return out
+
+def unsharp_mask(img, sigma: float = SHARPEN_SIGMA, amount: float = SHARPEN_AMOUNT,
+                 threshold: int = SHARPEN_THRESHOLD, strip_rows: int = STRIP_ROWS):
+    """
+    Returns a sharpened copy of an "L" or "RGB" image (None for other modes).
+
+    Only luminance is sharpened: its detail (luma minus its Gaussian blur) is
+    added to every channel, which avoids colour fringes and blurs one plane
+    instead of three. The image is processed in horizontal strips of strip_rows
+    output rows, each read with a kernel-radius overlap (edge rows repeated at
+    the page borders), so besides the output image only a few strip-sized float
+    arrays are alive at a time.
+    """
+    if img.mode not in ("RGB", "L"):
+        return None
+    kernel = gaussian_kernel(sigma)
+    radius = len(kernel) // 2
+    width, height = img.size
+    out = Image.new(img.mode, img.size)
+
+    for top in range(0, height, strip_rows):
+        bottom = min(height, top + strip_rows)
+        read_top, read_bottom = max(0, top - radius), min(height, bottom + radius)
+        strip = np.asarray(img.crop((0, read_top, width, read_bottom)), dtype=np.float32)
+        luma = strip if strip.ndim == 2 else strip @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+        # Pad to exactly `radius` rows on both sides and `radius` columns (edge replicated)
+        pad_rows = (radius - (top - read_top), radius - (read_bottom - bottom))
+        padded = np.pad(luma, [pad_rows, (radius, radius)], mode="edge")
+        del luma
+
+        detail = padded[radius:-radius, radius:-radius] - _convolve(_convolve(padded, kernel, 0), kernel, 1)
+        if threshold > 0:
+            detail[np.abs(detail) < threshold] = 0
+        detail *= amount
+
+        source = strip[top - read_top:top - read_top + bottom - top]
+        source += detail if source.ndim == 2 else detail[..., None]
+        np.clip(source, 0, 255, out=source)
+        out.paste(Image.fromarray(np.rint(source).astype(np.uint8), img.mode), (0, top))
+    return out
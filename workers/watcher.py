@@ -1,48 +1,99 @@
 import os
-import time
+import threading
 from PySide6.QtCore import QObject, Signal, Slot, QThread
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from digipage.core.config import ALLOWED_EXTENSIONS
+from digipage.workers.file_readiness import file_readiness, TEMP_SUFFIX
+
+# Files that never pass the readiness check (e.g. a PNG with bytes after IEND) are
+# reported after this long, provided their size has stopped changing; files still
+# growing are checked again every STABLE_INTERVAL until they stop
+READY_TIMEOUT = 3.0
+STABLE_INTERVAL = 0.5
 
 class NewImageHandler(FileSystemEventHandler):
-    """Handles file system events for the watchdog."""
+    """
+    Handles file system events for the watchdog.
+    A new image is reported as soon as it is complete: either the scanner closed
+    it after writing (inotify IN_CLOSE_WRITE) or its format trailer is present.
+    Files still being written wait in `_pending` without blocking the observer.
+    """
     def __init__(self, new_image_callback, change_callback):
         super().__init__()
         self.new_image_callback = new_image_callback
         self.change_callback = change_callback
+        self._pending = {} # path -> fallback timer
+        self._lock = threading.Lock()
 
-    def _wait_for_file_stability(self, file_path, timeout=3.0):
-        """Waits until file size stops changing (upload/write complete)."""
-        last_size = -1
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            try:
-                if not os.path.exists(file_path): return False
-                current_size = os.path.getsize(file_path)
-                if current_size == last_size and current_size > 0:
-                    return True
-                last_size = current_size
-                time.sleep(0.1)
-            except OSError:
-                time.sleep(0.1)
-        return False
+    def _report_if_ready(self, file_path, force=False):
+        with self._lock:
+            if file_path not in self._pending:
+                return
+            if not force and not file_readiness.is_ready(file_path):
+                return
+            self._pending.pop(file_path).cancel()
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            self.new_image_callback(file_path)
+
+    def _arm_timer(self, file_path, delay, renew=False):
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = -1
+        timer = threading.Timer(delay, self._on_timeout, (file_path, size))
+        timer.daemon = True
+        with self._lock:
+            if renew and file_path not in self._pending:
+                return # reported meanwhile
+            previous = self._pending.get(file_path)
+            if previous is not None:
+                previous.cancel()
+            self._pending[file_path] = timer
+        timer.start()
+
+    def _on_timeout(self, file_path, last_size):
+        # Fallback for files the readiness check never accepts: report once the size is stable
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            with self._lock:
+                self._pending.pop(file_path, None)
+            return
+        if size > 0 and size == last_size:
+            self._report_if_ready(file_path, force=True)
+        else:
+            self._arm_timer(file_path, STABLE_INTERVAL, renew=True)
 
     def on_created(self, event):
         if event.is_directory: return
         ext = os.path.splitext(event.src_path)[1].lower()
         if ext in ALLOWED_EXTENSIONS:
-            if self._wait_for_file_stability(event.src_path):
-                self.new_image_callback(event.src_path)
+            self._arm_timer(event.src_path, READY_TIMEOUT)
+            self._report_if_ready(event.src_path)
+
+    def on_modified(self, event):
+        if event.is_directory: return
+        file_readiness.mark_modified(event.src_path)
+        self._report_if_ready(event.src_path)
+
+    def on_closed(self, event):
+        if event.is_directory: return
+        file_readiness.mark_closed(event.src_path)
+        self._report_if_ready(event.src_path)
 
     def on_deleted(self, event):
-        if not event.is_directory:
+        if not event.is_directory and not event.src_path.endswith(TEMP_SUFFIX):
             self.change_callback()
 
     def on_moved(self, event):
-        if not event.is_directory:
-            self.change_callback()
+        if event.is_directory: return
+        if event.src_path.endswith(TEMP_SUFFIX) and file_readiness.take_replace(event.dest_path):
+            # A page this process rewrote in place; cached previews revalidate by fingerprint.
+            # Other renames (e.g. a scanner finishing "<scan>.tmp") still mean new files.
+            file_readiness.mark_closed(event.dest_path)
+            return
+        self.change_callback()
 
 class WatcherWorker(QObject):
     """Qt-friendly wrapper for the Watchdog library."""